@@ -3,15 +3,42 @@ import pandas as pd
 import random
 import io
 import os
-
+import csv
+import codecs
+import re
+import tempfile
+import threading
+import json
+import base64
+import math
+import hashlib
+import logging
+import time
+import uuid
+import sys
+import cProfile
+import pstats
+import tracemalloc
+from array import array
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+
+import warmup
+import state_backend
 import gspread
+import openpyxl
 from google.oauth2.service_account import Credentials
 
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.pdfgen import canvas
 from reportlab.lib.colors import HexColor, black
 from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib import font_manager
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
 
 
 # =========================================================
@@ -20,6 +47,424 @@ from reportlab.pdfbase.ttfonts import TTFont
 SPREADSHEET_ID = "15c7dqXD7OE87InzW8SMUiSa50mEfp1WNyegTpPWZCMo"
 
 
+# =========================================================
+# 0-1. 단계별 실행 시간 기록 (성능 패널 / 로그)
+# =========================================================
+# 한 번 실행(rerun)마다 단계별 시간·캐시 적중·크기를 모아
+# 한 줄짜리 JSON 로그로 남기고, 최근 실행들의 p50/p95를 프로세스 전체에서 집계한다.
+# 화면 패널은 주소에 ?debug=1 을 붙이면 나온다.
+PERF_WINDOW = 500  # 단계별로 보관할 최근 기록 수
+PERF_LOG = os.environ.get("MYCLASS_PERF_LOG", "1") != "0"
+
+perf_log = logging.getLogger("myclass.perf")
+
+
+@st.cache_resource
+def _perf_store():
+    if not perf_log.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        perf_log.addHandler(handler)
+        perf_log.setLevel(logging.INFO)
+        perf_log.propagate = False
+    return {"lock": threading.Lock(), "stages": defaultdict(lambda: deque(maxlen=PERF_WINDOW))}
+
+
+PERF_STORE = _perf_store()
+RUN_PERF = {"started": time.perf_counter(), "stages": [], "inputs": {}, "finished": False}
+
+
+def _record_stage(entry):
+    with PERF_STORE["lock"]:
+        PERF_STORE["stages"][entry["stage"]].append(entry["ms"])
+
+
+@contextmanager
+def perf_stage(name, **info):
+    # with perf_stage("assign_seats", students=24) as m: ... m["cache_hit"] = True
+    entry = {"stage": name, **info}
+    t0 = time.perf_counter()
+    try:
+        yield entry
+    finally:
+        entry["ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        if RUN_PERF["finished"]:
+            # 다운로드 버튼처럼 실행이 끝난 뒤 불리는 단계는 바로 기록
+            _record_stage(entry)
+            if PERF_LOG:
+                perf_log.info(json.dumps({"event": "stage", **entry}, ensure_ascii=False, default=str))
+        else:
+            RUN_PERF["stages"].append(entry)
+
+
+def perf_inputs(**info):
+    # 이번 실행의 입력값 (학생 수, 줄 수, 분단 수, 좌석 형태 …) — 느린 실행 기록에 함께 남긴다
+    RUN_PERF["inputs"].update(info)
+
+
+def finish_perf_run():
+    total_ms = round((time.perf_counter() - RUN_PERF["started"]) * 1000, 2)
+    RUN_PERF["finished"] = True
+    RUN_PERF["total_ms"] = total_ms
+    for entry in RUN_PERF["stages"]:
+        _record_stage(entry)
+    _record_stage({"stage": "rerun", "ms": total_ms})
+    if PERF_LOG:
+        perf_log.info(
+            json.dumps(
+                {"event": "rerun", "total_ms": total_ms, "stages": RUN_PERF["stages"]},
+                ensure_ascii=False,
+                default=str,
+            )
+        )
+    RUN_PERF["profile_path"] = profile_finish(
+        RUN_PERF.get("profile"), "rerun", total_ms, RUN_PERF["inputs"], RUN_PERF["stages"]
+    )
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def perf_summary():
+    with PERF_STORE["lock"]:
+        snapshot = {name: list(values) for name, values in PERF_STORE["stages"].items()}
+    return [
+        {
+            "단계": name,
+            "횟수": len(values),
+            "p50 (ms)": percentile(values, 50),
+            "p95 (ms)": percentile(values, 95),
+        }
+        for name, values in sorted(snapshot.items())
+    ]
+
+
+# ---------- 느린 실행 프로파일 (선택) ----------
+# MYCLASS_PROFILE_MS를 주면 실행마다 cProfile + tracemalloc을 켜 두고, 그보다 오래 걸린
+# 실행만 PROFILE_DIR/<시각>-<이름>-<ms>ms-<pid>/ 에 남긴다.
+#   profile.prof        python -m pstats / snakeviz 로 열기
+#   memory.tracemalloc  tracemalloc.Snapshot.load 로 열기
+#   report.txt          누적 시간 상위 함수 + 할당 상위 줄
+#   meta.json           입력값(학생 수, 줄 수, 분단 수, 좌석 형태 …)과 단계별 시간
+# 재는 동안은 느려지므로(보통 1.5~3배) 기준은 그만큼 넉넉히 잡는다.
+# cProfile · tracemalloc은 프로세스 전역이라 한 번에 한 실행만 잰다.
+PROFILE_MS = float(os.environ.get("MYCLASS_PROFILE_MS", "0"))  # 0이면 끔
+PROFILE_DIR = os.environ.get("MYCLASS_PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "myclass_profiles")
+PROFILE_KEEP = 50  # 남겨 둘 기록 수
+PROFILE_FRAMES = 8  # 할당마다 남길 호출 단계 수
+PROFILE_STALE = 300  # 중간에 멈춘 실행의 측정을 버리는 시간(초)
+PROFILE_TOP = 40  # report.txt에 적을 줄 수
+
+
+@st.cache_resource
+def _profile_slot():
+    return {"lock": threading.Lock(), "owner": None}
+
+
+PROFILE_SLOT = _profile_slot()
+
+
+def _profile_stop(capture, snapshot=False):
+    try:
+        capture["profiler"].disable()
+    except Exception:
+        pass
+    taken = tracemalloc.take_snapshot() if snapshot and tracemalloc.is_tracing() else None
+    if capture["tracing"] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return taken
+
+
+def profile_start():
+    # 켜져 있고 다른 실행을 재고 있지 않으면 측정 시작. 반환: capture (아니면 None)
+    if PROFILE_MS <= 0:
+        return None
+    me = threading.current_thread()
+    with PROFILE_SLOT["lock"]:
+        owner = PROFILE_SLOT["owner"]
+        if owner is not None:
+            # 같은 스레드의 예전 실행이 중간에 멈췄거나(다시 실행) 너무 오래된 측정이면 버린다
+            busy = owner["thread"] is not me and owner["thread"].is_alive()
+            if busy and time.monotonic() - owner["since"] < PROFILE_STALE:
+                return None
+            _profile_stop(owner)
+        capture = {
+            "thread": me,
+            "since": time.monotonic(),
+            "profiler": cProfile.Profile(),
+            "tracing": not tracemalloc.is_tracing(),  # 다른 곳에서 켠 tracemalloc은 끄지 않는다
+        }
+        PROFILE_SLOT["owner"] = capture
+    if capture["tracing"]:
+        tracemalloc.start(PROFILE_FRAMES)
+    capture["profiler"].enable()
+    return capture
+
+
+def profile_finish(capture, name, total_ms, inputs, stages=None):
+    # 측정을 끝내고, 기준보다 느렸으면 기록을 남긴다. 반환: 남긴 폴더 (없으면 None)
+    if capture is None:
+        return None
+    slow = total_ms >= PROFILE_MS
+    with PROFILE_SLOT["lock"]:
+        if PROFILE_SLOT["owner"] is not capture:
+            return None  # 다른 실행이 가져갔다
+        snapshot = _profile_stop(capture, snapshot=slow)
+        PROFILE_SLOT["owner"] = None
+    if not slow:
+        return None
+    try:
+        return write_profile(name, total_ms, inputs, stages, capture["profiler"], snapshot)
+    except OSError as e:
+        perf_log.warning("slow-run profile not saved: %s", e)
+        return None
+
+
+def profiled(name, fn, **inputs):
+    # 실행이 끝난 뒤 따로 불리는 작업(다운로드 버튼의 PDF 등)도 같은 기준으로 잰다
+    capture = profile_start()
+    t0 = time.perf_counter()
+    try:
+        return fn()
+    finally:
+        profile_finish(capture, name, round((time.perf_counter() - t0) * 1000, 2), inputs)
+
+
+def write_profile(name, total_ms, inputs, stages, profiler, snapshot):
+    path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{int(total_ms)}ms-{os.getpid()}")
+    os.makedirs(path, exist_ok=True)
+    profiler.dump_stats(os.path.join(path, "profile.prof"))
+
+    report = io.StringIO()
+    report.write(f"{name}: {total_ms} ms (기준 {PROFILE_MS:g} ms)\n{json.dumps(inputs, ensure_ascii=False, default=str)}\n\n")
+    pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(PROFILE_TOP)
+    if snapshot is not None:
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        snapshot.dump(os.path.join(path, "memory.tracemalloc"))
+        report.write("\n할당 상위 (줄 단위, 측정 끝날 때 남아 있던 것)\n")
+        for stat in snapshot.statistics("lineno")[:PROFILE_TOP]:
+            report.write(f"{stat}\n")
+    with open(os.path.join(path, "report.txt"), "w", encoding="utf-8") as f:
+        f.write(report.getvalue())
+
+    meta = {
+        "name": name,
+        "total_ms": total_ms,
+        "threshold_ms": PROFILE_MS,
+        "saved_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "pid": os.getpid(),
+        "python": sys.version.split()[0],
+        "inputs": inputs,
+        "stages": stages or [],
+    }
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=1, default=str)
+
+    _prune_profile_dir()
+    perf_log.warning(
+        json.dumps({"event": "slow_profile", "name": name, "total_ms": total_ms, "path": path, **inputs},
+                   ensure_ascii=False, default=str)
+    )
+    return path
+
+
+def _profile_dirs():
+    try:
+        names = os.listdir(PROFILE_DIR)
+    except FileNotFoundError:
+        return []
+    paths = [os.path.join(PROFILE_DIR, name) for name in names]
+    return sorted((p for p in paths if os.path.isdir(p)), key=os.path.getmtime)
+
+
+def _prune_profile_dir():
+    paths = _profile_dirs()
+    for path in paths[:max(0, len(paths) - PROFILE_KEEP)]:
+        for name in os.listdir(path):
+            try:
+                os.remove(os.path.join(path, name))
+            except OSError:
+                pass
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass
+
+
+def recent_profiles(limit=10):
+    # 최근 기록 (성능 패널 표)
+    rows = []
+    for path in reversed(_profile_dirs()[-limit:]):
+        try:
+            with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        rows.append({
+            "저장 시각": meta["saved_at"],
+            "작업": meta["name"],
+            "ms": meta["total_ms"],
+            **{k: v for k, v in meta["inputs"].items() if not isinstance(v, (list, dict))},
+            "폴더": path,
+        })
+    return rows
+
+
+RUN_PERF["profile"] = profile_start()
+
+
+# =========================================================
+# 0-2. 공용 메모리 저장소 (모든 세션이 같이 쓰는 LRU)
+# =========================================================
+# 명단(DataFrame), 화면 HTML, PDF/이미지 bytes를 내용 해시로 한 번만 들고 있는다.
+# 같은 학년을 여러 선생님이 보고 있어도 한 벌만 메모리에 남는다.
+# 전체 크기가 STORE_MAX_BYTES를 넘으면 가장 오래 안 쓴 것부터 버린다.
+STORE_MAX_BYTES = int(os.environ.get("MYCLASS_STORE_MB", "128")) * 1024 * 1024
+
+
+@st.cache_resource
+def _shared_store():
+    return {
+        "lock": threading.Lock(),
+        "items": OrderedDict(),  # (종류, 키) → (값, 크기)
+        "bytes": 0,
+        "stats": defaultdict(
+            lambda: {"hits": 0, "shared_hits": 0, "misses": 0, "evictions": 0, "items": 0, "bytes": 0}
+        ),
+    }
+
+
+SHARED_STORE = _shared_store()
+
+
+def content_key(*parts):
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def store_get(kind, key):
+    with SHARED_STORE["lock"]:
+        item = SHARED_STORE["items"].get((kind, key))
+        stats = SHARED_STORE["stats"][kind]
+        if item is None:
+            stats["misses"] += 1
+            return None
+        SHARED_STORE["items"].move_to_end((kind, key))
+        stats["hits"] += 1
+        return item[0]
+
+
+def store_put(kind, key, value, size):
+    # 다른 세션이 먼저 넣었으면 그 값을 돌려준다 (한 벌만 유지)
+    with SHARED_STORE["lock"]:
+        items = SHARED_STORE["items"]
+        if (kind, key) in items:
+            return items[(kind, key)][0]
+        if size > STORE_MAX_BYTES:
+            return value
+
+        items[(kind, key)] = (value, size)
+        SHARED_STORE["bytes"] += size
+        stats = SHARED_STORE["stats"][kind]
+        stats["items"] += 1
+        stats["bytes"] += size
+
+        while SHARED_STORE["bytes"] > STORE_MAX_BYTES:
+            (old_kind, _), (_, old_size) = items.popitem(last=False)
+            SHARED_STORE["bytes"] -= old_size
+            old = SHARED_STORE["stats"][old_kind]
+            old["items"] -= 1
+            old["bytes"] -= old_size
+            old["evictions"] += 1
+    return value
+
+
+def store_cached(kind, key, build, size_of=len, keep=None):
+    # 반환: (값, 저장소에 있었는지)
+    # 메모리에 없으면 (PDF · 이미지는) 워커 공용 상태 저장소 → 새로 만들기 순
+    # keep(값)이 거짓이면 새로 만든 값을 어느 저장소에도 두지 않고 돌려주기만 한다
+    value = store_get(kind, key)
+    if value is not None:
+        return value, True
+
+    shared = kind in SHARED_ASSET_KINDS
+    if shared:
+        value = state_get(f"asset:{kind}:{key}")
+        if value is not None:
+            with SHARED_STORE["lock"]:
+                SHARED_STORE["stats"][kind]["shared_hits"] += 1
+            return store_put(kind, key, value, size_of(value)), True
+
+    value = build()
+    if keep is not None and not keep(value):
+        return value, False
+    if shared:
+        state_set(f"asset:{kind}:{key}", value, ttl=SHARED_ASSET_TTL)
+    return store_put(kind, key, value, size_of(value)), False
+
+
+def store_summary():
+    with SHARED_STORE["lock"]:
+        stats = {kind: dict(values) for kind, values in SHARED_STORE["stats"].items()}
+        total = SHARED_STORE["bytes"]
+    rows = []
+    for kind, v in sorted(stats.items()):
+        lookups = v["hits"] + v["misses"]
+        hits = v["hits"] + v["shared_hits"]
+        rows.append(
+            {
+                "종류": kind,
+                "항목 수": v["items"],
+                "크기 (MB)": round(v["bytes"] / 1024 / 1024, 2),
+                "적중": v["hits"],
+                "적중 (워커 공용)": v["shared_hits"],
+                "실패": v["misses"],
+                "적중률": f"{hits / lookups:.0%}" if lookups else "-",
+                "밀려남": v["evictions"],
+            }
+        )
+    return rows, total
+
+
+# =========================================================
+# 0-3. 워커 공용 상태 저장소 (state_backend.py)
+# =========================================================
+# 서버 프로세스를 여러 개 띄워도 저장한 배치, 받아 둔 명단, 만든 PDF · 이미지를
+# 같이 보도록 SQLite(기본) / Redis 등에 둔다. 저장소가 안 되면 기록만 남기고
+# 이 프로세스 안에서 계속 동작한다.
+SHARED_ASSET_KINDS = {"pdf", "image"}  # HTML은 새로 만드는 쪽이 더 빠르다
+SHARED_ASSET_TTL = 24 * 3600
+state_log = logging.getLogger("myclass.state")
+STATE = state_backend.get_backend()
+
+
+def state_get(key):
+    try:
+        return STATE.get(key)
+    except Exception as e:
+        state_log.warning("state get %s failed: %s", key, e)
+        return None
+
+
+def state_set(key, value, ttl=None):
+    try:
+        STATE.set(key, value, ttl=ttl)
+    except Exception as e:
+        state_log.warning("state set %s failed: %s", key, e)
+
+
+def state_scan(prefix):
+    try:
+        return STATE.scan(prefix)
+    except Exception as e:
+        state_log.warning("state scan %s failed: %s", prefix, e)
+        return []
+
+
 # =========================================================
 # 1. 폰트 설정 (MaruBuri)
 # =========================================================
@@ -37,14 +482,9 @@ for p in FONT_CANDIDATES:
         FONT_PATH = p
         break
 
-KOREAN_FONT = "MaruBuri"
-if FONT_PATH:
-    try:
-        pdfmetrics.registerFont(TTFont(KOREAN_FONT, FONT_PATH))
-    except Exception:
-        KOREAN_FONT = "Helvetica"
-else:
-    KOREAN_FONT = "Helvetica"
+# 글꼴 파일은 프로세스에서 한 번만 읽는다 (실패하면 Helvetica)
+with perf_stage("fonts"):
+    KOREAN_FONT = warmup.register_font("MaruBuri", FONT_PATH)
 
 
 # =========================================================
@@ -72,49 +512,361 @@ def create_sample_students_df():
 # =========================================================
 # 3. Google Sheets → 데이터 불러오기
 # =========================================================
+NUMBER_COLUMNS = ["출석 번호", "번호", "Number", "NO", "No"]
+NAME_COLUMNS = ["이름", "Name", "학생명", "성명"]
+GENDER_COLUMNS = ["성별", "Gender", "gender", "sex", "Sex"]
+ABILITY_COLUMNS = ["수준", "능력", "성적", "점수", "Level", "level", "Ability", "ability", "Score", "score"]  # 선택 (모둠 구성용)
+ABILITY_LEVELS = {"상": 3, "중상": 2.5, "중": 2, "중하": 1.5, "하": 1}
+
+
+def roster_signature(student_list):
+    raw = json.dumps(student_list, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+GENDER_VALUES = {
+    "여": "여", "여자": "여", "f": "여", "female": "여", "girl": "여",
+    "남": "남", "남자": "남", "m": "남", "male": "남", "boy": "남",
+}
+REPORT_COLUMNS = ["행", "문제", "값", "처리"]
+
+
+def _first_column(df, aliases):
+    return next((c for c in aliases if c in df.columns), None)
+
+
+def _text(series):
+    # 앞뒤 공백을 지우고 빈 문자열은 결측으로 (숫자 칸은 그대로)
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    text = series.astype("string").str.strip()
+    return text.mask(text == "")
+
+
+def clean_roster(raw):
+    # 명단을 한 번에(열 단위로) 정리한다. 반환: (정리된 DataFrame, 문제 목록 DataFrame)
+    # - 열 이름은 출석 번호 / 이름 / 성별로 맞추고, 성별은 남 / 여로 통일
+    # - 빈 줄, 이름 없는 줄, 똑같은 학생이 두 번 있는 줄은 뺀다
+    # - 숫자가 아닌 번호, 모르는 성별, 겹치는 번호는 남겨 두고 알려 준다
+    # - 수준 열이 있으면 숫자(상/중/하도 됨)로 바꾼다
+    # 문제 목록의 "행"은 시트 · 파일에서의 줄 번호 (SOURCE_ROW 열이 있으면 그 값)
+    num_col, name_col, gender_col, ability_col = (
+        _first_column(raw, aliases) for aliases in (NUMBER_COLUMNS, NAME_COLUMNS, GENDER_COLUMNS, ABILITY_COLUMNS)
+    )
+    df = raw.apply(_text).rename(
+        columns={num_col: "출석 번호", name_col: "이름", gender_col: "성별", ability_col: "수준"}
+    )
+    # 파일에서 읽었으면 읽을 때 붙인 줄 번호, 시트면 머리글 다음 줄부터
+    rows = df.pop(SOURCE_ROW) if SOURCE_ROW in df.columns else df.index.to_series() + 2
+    df["이름"] = df["이름"].astype("string")
+    df["성별"] = df["성별"].astype("string")
+    problems = []
+
+    def report(mask, problem, values, action):
+        if mask.any():
+            problems.append(pd.DataFrame({
+                "행": rows[mask], "문제": problem, "값": values[mask].astype("string"), "처리": action,
+            }))
+
+    number = pd.to_numeric(df["출석 번호"], errors="coerce")
+    bad_number = (number.isna() | (number % 1 != 0)) & df["출석 번호"].notna()
+    blank = df["출석 번호"].isna() & df["이름"].isna()
+    no_name = df["이름"].isna() & ~blank
+    report(blank, "빈 줄", df["이름"], "뺌")
+    if no_name.any():
+        # 빈 줄이 섞이면 번호 열이 실수가 되므로 정수 번호는 정수로 보여 준다
+        shown = number.mask(bad_number).astype("Int64").astype("string")
+        report(no_name, "이름 없음", shown.fillna(df["출석 번호"].astype("string")), "뺌")
+    report(bad_number & ~no_name, "번호가 숫자가 아님", df["출석 번호"], "번호 비움")
+    df["출석 번호"] = number.mask(bad_number).astype("Int64")
+
+    gender = df["성별"].str.lower().map(GENDER_VALUES)
+    report(gender.isna() & df["성별"].notna() & ~blank & ~no_name, "알 수 없는 성별", df["성별"], "회색으로 표시")
+    report(df["성별"].isna() & ~blank & ~no_name, "성별 없음", df["이름"], "회색으로 표시")
+    df["성별"] = gender.astype("string")
+
+    if ability_col is not None:
+        ability = df["수준"].astype("string")
+        level = pd.to_numeric(ability.map(ABILITY_LEVELS).fillna(ability), errors="coerce")
+        report(level.isna() & ability.notna() & ~blank & ~no_name, "수준이 숫자가 아님", ability, "비움 (가운데로 침)")
+        df["수준"] = level.astype("Float64")
+
+    keep = ~(blank | no_name)
+    twice = df.duplicated(subset=["출석 번호", "이름", "성별"]) & keep
+    report(twice, "같은 학생이 두 번", df["이름"], "뺌")
+    keep &= ~twice
+    same_number = df["출석 번호"].notna() & keep
+    same_number &= df["출석 번호"].where(same_number).duplicated(keep=False) & same_number
+    report(same_number, "번호 겹침", df["출석 번호"].astype("string") + " " + df["이름"], "그대로 둠 (확인 필요)")
+
+    cleaned = df[keep].reset_index(drop=True)
+    if problems:
+        problems = pd.concat(problems).sort_values("행", kind="stable").reset_index(drop=True)
+    else:
+        problems = pd.DataFrame(columns=REPORT_COLUMNS)
+    return cleaned, problems
+
+
+def roster_records(df):
+    # pd.NA / NaN은 None으로 (dict 목록을 쓰는 쪽이 결측 종류를 신경 쓰지 않게)
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def shared_roster(key, build_df):
+    # 같은 내용의 명단은 정리까지 한 번만 해서 원본 / 정리된 DataFrame / dict 목록 /
+    # 문제 목록 / 서명을 한 벌로 모든 세션이 같이 쓴다 (읽기 전용으로만 쓸 것)
+    def build():
+        raw = build_df()
+        if check_roster_columns(raw):
+            df, report = clean_roster(raw)
+        else:
+            df, report = raw, pd.DataFrame(columns=REPORT_COLUMNS)
+        students = roster_records(df)
+        return {"raw": raw, "df": df, "list": students, "report": report, "sig": roster_signature(students)}
+
+    # dict 목록은 DataFrame과 비슷한 크기로 잡는다
+    def size_of(r):
+        return int(r["raw"].memory_usage(deep=True).sum()) + 2 * int(r["df"].memory_usage(deep=True).sum())
+
+    roster, _ = store_cached("roster", key, build, size_of=size_of)
+    return roster
+
+
+def sample_roster():
+    return shared_roster("sample", create_sample_students_df)
+
+
 def load_student_data():
     try:
-        service_info = st.secrets["gcp_service_account"]
+        st.secrets["gcp_service_account"]
     except Exception:
         st.error("❌ secrets에 [gcp_service_account]가 없습니다.")
-        return create_sample_students_df()
+        return sample_roster()
 
-    try:
-        creds = Credentials.from_service_account_info(
-            service_info,
-            scopes=["https://www.googleapis.com/auth/spreadsheets.readonly"],
-        )
-        client = gspread.authorize(creds)
-
-        sh = client.open_by_key(SPREADSHEET_ID)
-        ws = sh.sheet1
-        records = ws.get_all_records()
+    # 명단은 백그라운드 스레드가 받아 둔 것을 쓴다 (warmup.py)
+    records, _, error = warmup.roster(SPREADSHEET_ID)
+    if records is None:
+        st.error(f"❌ Google Sheets 오류: {error or '응답이 없습니다.'}")
+        return sample_roster()
 
+    try:
         if not records:
             st.warning("⚠️ 시트에 데이터가 없습니다.")
-            return create_sample_students_df()
+            return sample_roster()
 
-        df = pd.DataFrame(records)
+        roster = shared_roster(roster_signature(records), lambda: pd.DataFrame(records))
 
         # 필수 컬럼이 있는지 확인
-        cols = df.columns
-        has_num = any(c in cols for c in ["출석 번호", "번호", "Number", "NO", "No"])
-        has_name = any(c in cols for c in ["이름", "Name", "학생명", "성명"])
-        has_gender = any(c in cols for c in ["성별", "Gender", "gender", "sex", "Sex"])
-
-        if not (has_num and has_name and has_gender):
+        if not check_roster_columns(roster["df"]):
             st.error("❌ '출석 번호/번호', '이름', '성별' 컬럼을 찾지 못했습니다.")
-            return create_sample_students_df()
+            return sample_roster()
 
-        return df
+        return roster
 
     except Exception as e:
         st.error(f"❌ Google Sheets 오류: {e}")
-        return create_sample_students_df()
+        return sample_roster()
+
+
+# =========================================================
+# 3-1. 내 컴퓨터 파일 → 데이터 불러오기 (CSV / 엑셀 / Parquet)
+# =========================================================
+# NEIS 등에서 내려받은 명단 파일을 네트워크 없이 바로 읽는다.
+# CSV/Parquet는 pyarrow로, 엑셀은 openpyxl 읽기 전용 모드로 한 줄씩 읽는다.
+# 위쪽에 "○학년 ○반 명렬표" 같은 제목 줄이 있어도 컬럼 이름이 있는 줄부터 읽는다.
+HEADER_SCAN_ROWS = 20
+SOURCE_ROW = "_행"  # 파일에서의 줄 번호 (정리할 때 문제 목록으로 옮기고 뺀다)
+EMPTY_LINE = re.compile(rb"^(?=\r?$)", re.M)
+
+
+def check_roster_columns(df):
+    cols = df.columns
+    has_num = any(c in cols for c in NUMBER_COLUMNS)
+    has_name = any(c in cols for c in NAME_COLUMNS)
+    has_gender = any(c in cols for c in GENDER_COLUMNS)
+    return has_num and has_name and has_gender
+
+
+def _is_header_row(values):
+    names = {str(v).strip() for v in values if v is not None}
+    return bool(names & set(NUMBER_COLUMNS + NAME_COLUMNS + GENDER_COLUMNS))
+
+
+def _tidy_roster(df, source_rows=None):
+    # 읽은 줄 번호를 SOURCE_ROW 열로 붙인다 (기본: 머리글이 1행인 순서).
+    # 중간의 빈 줄은 남겨 두고(정리할 때 "빈 줄"로 알림) 끝에 붙은 빈 줄만 뺀다
+    df.columns = [str(c).strip() for c in df.columns]
+    end = len(df)
+    if end and not df.iloc[-1].notna().any():
+        filled = df.notna().any(axis=1).to_numpy()
+        end = len(filled) - filled[::-1].argmax() if filled.any() else 0
+        df = df.iloc[:end].reset_index(drop=True)
+    rows = range(2, end + 2) if source_rows is None else source_rows[:end]
+    df.insert(0, SOURCE_ROW, rows)
+    return df
+
+
+def _to_utf8(data):
+    # 엑셀에서 저장한 CSV는 BOM이 붙거나 cp949(EUC-KR)인 경우가 많다
+    if data.startswith(codecs.BOM_UTF8):
+        return data[len(codecs.BOM_UTF8):]
+    try:
+        data.decode("utf-8")
+        return data
+    except UnicodeDecodeError:
+        return data.decode("cp949").encode("utf-8")
+
+
+def read_roster_csv(data):
+    data = _to_utf8(data)
+    # 컬럼 이름 줄의 시작 위치를 찾아 그 뒤만 pyarrow에 넘긴다
+    lines = data[:64 * 1024].splitlines(keepends=True)[:HEADER_SCAN_ROWS]
+    start = offset = 0
+    header_line = 1
+    width = len(next(csv.reader([lines[0].decode("utf-8", errors="ignore")]), [])) if lines else 0
+    for number, line in enumerate(lines, 1):
+        fields = next(csv.reader([line.decode("utf-8", errors="ignore")]), [])
+        if _is_header_row(fields):
+            start, header_line, width = offset, number, len(fields)
+            break
+        offset += len(line)
+
+    # pyarrow는 완전히 빈 줄을 건너뛰어 줄 번호가 밀리므로 구분자만 채워 한 줄로 읽힌다
+    body = data[start:]
+    if b"\n\n" in body or b"\n\r\n" in body:
+        body = EMPTY_LINE.sub(b"," * max(0, width - 1), body)
+    df = pd.read_csv(io.BytesIO(body), engine="pyarrow")
+    return _tidy_roster(df, range(header_line + 1, header_line + 1 + len(df)))
+
+
+def read_roster_excel(data):
+    wb = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = None
+        for header_row, values in zip(range(1, HEADER_SCAN_ROWS + 1), rows):
+            if _is_header_row(values):
+                header = [str(v).strip() if v is not None else "" for v in values]
+                break
+        if header is None:
+            raise ValueError("앞쪽 줄에서 '번호/이름/성별' 컬럼 이름을 찾지 못했습니다.")
+
+        # 중간의 빈 줄은 남기고(줄 번호 유지) 끝에 이어지는 빈 줄은 담지 않는다
+        # (서식만 있는 줄이 수만 개여도 목록이 커지지 않게 개수만 센다)
+        width = len(header)
+        blank = (None,) * width
+        records, numbers = [], []
+        blank_from = blank_count = 0
+        for number, values in enumerate(rows, header_row + 1):
+            values = values[:width]
+            if all(v is None for v in values):
+                if not blank_count:
+                    blank_from = number
+                blank_count += 1
+                continue
+            records += [blank] * blank_count
+            numbers += range(blank_from, blank_from + blank_count)
+            blank_count = 0
+            records.append(values)
+            numbers.append(number)
+    finally:
+        wb.close()
+
+    # 이름 없는 열은 위치로 뺀다 (이름으로 고르면 같은 이름의 열이 늘어난다)
+    df = pd.DataFrame(records, columns=header)
+    return _tidy_roster(df.loc[:, [bool(c) for c in header]], numbers)
+
+
+def read_roster_parquet(data):
+    return _tidy_roster(pd.read_parquet(io.BytesIO(data)))
+
+
+ROSTER_READERS = {
+    ".csv": read_roster_csv,
+    ".txt": read_roster_csv,
+    ".xlsx": read_roster_excel,
+    ".xlsm": read_roster_excel,
+    ".parquet": read_roster_parquet,
+}
+
+
+def read_roster_file(file_name, data):
+    # 실패하면 ValueError
+    ext = os.path.splitext(file_name)[1].lower()
+    reader = ROSTER_READERS.get(ext)
+    if reader is None:
+        raise ValueError(f"지원하지 않는 파일 형식입니다: {ext or file_name}")
 
+    try:
+        df = reader(data)
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"파일을 읽지 못했습니다: {e}")
+
+    repeated = sorted({c for c in df.columns[df.columns.duplicated()]})
+    if repeated:
+        raise ValueError(f"같은 이름의 컬럼이 두 번 이상 있습니다: {', '.join(map(str, repeated))}")
+    if df.empty:
+        raise ValueError("파일에 학생 데이터가 없습니다.")
+    if not check_roster_columns(df):
+        raise ValueError("'출석 번호/번호', '이름', '성별' 컬럼을 찾지 못했습니다.")
+    return df
+
+
+def load_student_file(uploaded):
+    if uploaded is None:
+        st.info("📂 왼쪽에서 명단 파일을 올려 주세요. 지금은 예시 명단입니다.")
+        return sample_roster()
+
+    # 같은 파일(내용)은 한 번만 읽는다
+    data = uploaded.getvalue()
+    key = content_key(os.path.splitext(uploaded.name)[1].lower(), hashlib.sha256(data).hexdigest())
+    try:
+        return shared_roster(key, lambda: read_roster_file(uploaded.name, data))
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        return sample_roster()
+
+
+# 명단 출처: 키 → 표시 이름
+ROSTER_SOURCES = {
+    "sheets": "Google Sheets",
+    "file": "내 컴퓨터 파일 (CSV · 엑셀 · Parquet)",
+}
+
+with st.sidebar:
+    roster_source = st.radio("명단 불러오기", list(ROSTER_SOURCES), format_func=ROSTER_SOURCES.get)
+    roster_upload = None
+    if roster_source == "file":
+        roster_upload = st.file_uploader(
+            "명단 파일",
+            type=[ext.lstrip(".") for ext in ROSTER_READERS],
+            help="'출석 번호(번호)', '이름', '성별' 컬럼이 있어야 합니다.",
+        )
 
-STUDENTS_DF = load_student_data()
-STUDENTS_LIST = STUDENTS_DF.to_dict("records")
+with perf_stage("roster_load", source=roster_source) as m:
+    if roster_source == "file":
+        ROSTER = load_student_file(roster_upload)
+    else:
+        ROSTER = load_student_data()
+    STUDENTS_DF = ROSTER["df"]
+    STUDENTS_LIST = ROSTER["list"]
+    m["students"] = len(STUDENTS_LIST)
+perf_inputs(roster_source=roster_source, students=len(STUDENTS_LIST))
+
+if roster_source == "sheets":
+    _, fetched_at, fetch_error = warmup.roster(SPREADSHEET_ID)
+    with st.sidebar:
+        if fetched_at:
+            st.caption(f"명단 받은 시각: {time.strftime('%H:%M:%S', time.localtime(fetched_at))}")
+        if fetch_error and fetched_at:
+            st.caption(f"⚠️ 마지막 새로고침 실패: {fetch_error}")
+        st.button(
+            "🔄 명단 새로고침",
+            on_click=warmup.request_refresh,
+            help=f"명단은 {warmup.REFRESH_SECONDS:.0f}초마다 자동으로 다시 받습니다. 지금 바로 받으려면 누르세요.",
+        )
 
 
 # =========================================================
@@ -168,56 +920,659 @@ def student_to_seat(student: dict):
 
 
 # =========================================================
-# 5. 좌석 배치 로직 (Single / Paired)
+# 5. 좌석 배치 로직 (Single / Paired / Group4~6)
 # =========================================================
-def assign_seats(student_list, rows, bun_dan, mode):
-    students = student_list[:]
-    random.shuffle(students)
+# 모둠 모드는 "Group" + 모둠 인원 (예: "Group5"). 분단 수 = 한 줄의 모둠 수,
+# 줄 수 = 모둠 줄 수. 자리 순서는 모둠마다 이어진다 (1모둠 자리들, 2모둠 자리들, ...).
+EMPTY_SEAT = -1
+GROUP_SIZES = [4, 5, 6]
+
+
+def is_group_mode(mode):
+    return mode.startswith("Group")
 
+
+def group_size(mode):
+    # 분단(책상 묶음) 하나의 자리 수
+    if is_group_mode(mode):
+        return int(mode[len("Group"):])
     if mode == "Paired":
-        cols = bun_dan * 2  # 한 모둠에 2자리
+        return 2
+    return 1
+
+
+def desk_block(mode):
+    # 책상 묶음 하나를 그릴 때의 (가로 칸 수, 세로 칸 수). 모둠은 두 줄로 마주 본다
+    size = group_size(mode)
+    if size <= 2:
+        return size, 1
+    return (size + 1) // 2, 2
+
+
+def seats_per_row(bun_dan, mode):
+    return bun_dan * group_size(mode)
+
+
+def assign_order(num_students, rows, bun_dan, mode, seed=None):
+    # 좌석 순서(앞줄 왼쪽부터) → 학생 인덱스, 빈 자리는 EMPTY_SEAT
+    # seed를 주면 같은 명단/설정에서 항상 같은 배치가 나온다
+    rng = random.Random(seed) if seed is not None else random
+    total_seats = rows * seats_per_row(bun_dan, mode)
+    order = list(range(num_students))
+    rng.shuffle(order)
+    order = order[:total_seats]
+    order += [EMPTY_SEAT] * (total_seats - len(order))
+    return order
+
+
+def build_matrix(student_list, order, rows, bun_dan, mode):
+    cols = seats_per_row(bun_dan, mode)
+    seat_matrix = []
+    for r in range(rows):
+        row = []
+        for idx in order[r * cols:(r + 1) * cols]:
+            row.append(student_to_seat(student_list[idx]) if idx != EMPTY_SEAT else None)
+        seat_matrix.append(row)
+    return seat_matrix
+
+
+def assign_seats(student_list, rows, bun_dan, mode, seed=None):
+    if is_group_mode(mode):
+        order = assign_order_groups(student_list, rows, bun_dan, mode, seed)
     else:
-        cols = bun_dan
+        order = assign_order(len(student_list), rows, bun_dan, mode, seed)
+    return build_matrix(student_list, order, rows, bun_dan, mode)
+
+
+# =========================================================
+# 5-1. 배치 기록 (실행 취소 / 다시 실행 / 저장 / 비교)
+# =========================================================
+# 각 버전은 matrix(dict 목록)를 통째로 복사하지 않고 순열(array("h"))로 저장한다.
+# 새로 섞은 배치는 전체 순열(기준 버전)로, 자리 바꾸기처럼 조금만 바뀐 배치는
+# 기준 버전에 대한 차이(바뀐 자리/학생)만 저장한다. 복원은 항상 한 단계.
+def new_history(roster_sig, num_students):
+    return {
+        "roster": roster_sig,
+        "versions": [],   # {"layout": (rows, bun_dan, mode), "ref": 기준 버전, "delta": ...}
+        "timeline": [],   # 실행 취소/다시 실행 순서 (버전 번호 목록)
+        "cursor": -1,
+        "saved": {},      # 이름 → 버전 번호
+        "synced": set(),  # 이미 더한(또는 직접 저장한) 상태 저장소 키
+        "uploaded": set(),  # 시트에 이미 기록한 버전 번호
+        "fairness": new_fairness(roster_sig, num_students),  # 저장한 배치의 줄/구역 누적
+    }
+
+
+def _encode_delta(base, order):
+    if base is None or len(base) != len(order):
+        return ("full", array("h", order))
+
+    pos = array("h")
+    val = array("h")
+    for i, (a, b) in enumerate(zip(base, order)):
+        if a != b:
+            pos.append(i)
+            val.append(b)
+
+    # 절반 이상 바뀌었으면 그냥 전체 순열이 더 작다
+    if len(pos) * 2 >= len(order):
+        return ("full", array("h", order))
+    return ("sparse", pos, val)
+
+
+def history_order(history, vid):
+    version = history["versions"][vid]
+    delta = version["delta"]
+    if delta[0] == "full":
+        return list(delta[1])
+
+    order = list(history["versions"][version["ref"]]["delta"][1])
+    for p, v in zip(delta[1], delta[2]):
+        order[p] = v
+    return order
+
+
+def history_layout(history, vid):
+    return history["versions"][vid]["layout"]
+
+
+def history_current(history):
+    if history["cursor"] < 0:
+        return None
+    return history["timeline"][history["cursor"]]
+
+
+def history_checkout(history, vid):
+    # 기존 버전을 다시 현재로 (redo 가지는 잘라냄)
+    del history["timeline"][history["cursor"] + 1:]
+    history["timeline"].append(vid)
+    history["cursor"] = len(history["timeline"]) - 1
+
+
+def history_push(history, order, layout):
+    ref = None
+    base = None
+    current = history_current(history)
+    if current is not None:
+        version = history["versions"][current]
+        ref = current if version["delta"][0] == "full" else version["ref"]
+        base = history["versions"][ref]["delta"][1]
+
+    delta = _encode_delta(base, order)
+    history["versions"].append(
+        {"layout": layout, "ref": ref if delta[0] == "sparse" else None, "delta": delta}
+    )
+    history_checkout(history, len(history["versions"]) - 1)
+    return len(history["versions"]) - 1
+
+
+def history_add(history, order, layout):
+    # 실행 취소 순서는 그대로 두고 버전만 추가 (다른 세션이 저장한 배치)
+    history["versions"].append({"layout": layout, "ref": None, "delta": ("full", array("h", order))})
+    return len(history["versions"]) - 1
+
+
+def history_undo(history):
+    if history["cursor"] > 0:
+        history["cursor"] -= 1
+
+
+def history_redo(history):
+    if history["cursor"] < len(history["timeline"]) - 1:
+        history["cursor"] += 1
+
+
+def history_swap(history, seat_a, seat_b):
+    vid = history_current(history)
+    order = history_order(history, vid)
+    order[seat_a], order[seat_b] = order[seat_b], order[seat_a]
+    history_push(history, order, history_layout(history, vid))
+
+
+def seat_position_label(seat, layout):
+    _, bun_dan, mode = layout
+    if is_group_mode(mode):
+        size = group_size(mode)
+        return f"{seat // size + 1}모둠 {seat % size + 1}번째"
+    cols = seats_per_row(bun_dan, mode)
+    return f"{seat // cols + 1}줄 {seat % cols + 1}번째"
+
 
+def diff_orders(order_a, layout_a, order_b, layout_b):
+    # 학생별 자리 (없으면 None) 비교 → 자리가 바뀐 학생 목록
+    seat_a = {idx: s for s, idx in enumerate(order_a) if idx != EMPTY_SEAT}
+    seat_b = {idx: s for s, idx in enumerate(order_b) if idx != EMPTY_SEAT}
+
+    moved = []
+    for idx in sorted(set(seat_a) | set(seat_b)):
+        a = seat_a.get(idx)
+        b = seat_b.get(idx)
+        label_a = seat_position_label(a, layout_a) if a is not None else "-"
+        label_b = seat_position_label(b, layout_b) if b is not None else "-"
+        if label_a != label_b:
+            moved.append((idx, label_a, label_b))
+    return moved
+
+
+# =========================================================
+# 5-2. 배치 공유 코드 (URL로 같은 배치 다시 열기)
+# =========================================================
+# [버전, 모드, 줄 수, 분단 수, 학생 수(2), 명단 서명(6)] + 순열 순위(가변 길이)
+# 순열은 자리마다 "남은 학생 + 빈 자리" 중 몇 번째인지를 혼합 진법으로 모아
+# 하나의 정수로 만든다. 24명 기준 전체 코드가 40자 안팎.
+SHARE_CODE_VERSION = 1
+LAYOUT_MIN, LAYOUT_MAX = 2, 10  # 줄 수 · 분단(모둠) 수 입력 범위 (코드도 이 안이어야 한다)
+MODE_CODES = {"Single": 0, "Paired": 1, **{f"Group{size}": size for size in GROUP_SIZES}}
+SHARE_HEADER_LEN = 12
+
+
+def _order_symbols(remaining, empties):
+    return remaining + ([EMPTY_SEAT] if empties else [])
+
+
+def _rank_order(order, num_students):
+    remaining = list(range(num_students))
+    empties = len(order) - num_students
+    if empties < 0 or sorted(idx for idx in order if idx != EMPTY_SEAT) != remaining:
+        raise ValueError("모든 학생이 자리에 앉아 있어야 코드로 만들 수 있습니다.")
+
+    value = 0
+    mult = 1
+    for idx in order:
+        symbols = _order_symbols(remaining, empties)
+        value += symbols.index(idx) * mult
+        mult *= len(symbols)
+        if idx == EMPTY_SEAT:
+            empties -= 1
+        else:
+            remaining.remove(idx)
+    return value
+
+
+def _unrank_order(value, num_students, total_seats):
+    remaining = list(range(num_students))
+    empties = total_seats - num_students
+    order = []
+    for _ in range(total_seats):
+        symbols = _order_symbols(remaining, empties)
+        value, digit = divmod(value, len(symbols))
+        idx = symbols[digit]
+        order.append(idx)
+        if idx == EMPTY_SEAT:
+            empties -= 1
+        else:
+            remaining.remove(idx)
+    if value:
+        raise ValueError("배치 코드가 올바르지 않습니다.")
+    return order
+
+
+def encode_share_code(order, layout, roster_sig, num_students):
+    rows, bun_dan, mode = layout
+    header = (
+        bytes([SHARE_CODE_VERSION, MODE_CODES[mode], rows, bun_dan])
+        + num_students.to_bytes(2, "big")
+        + bytes.fromhex(roster_sig)
+    )
+    value = _rank_order(order, num_students)
+    body = value.to_bytes((value.bit_length() + 7) // 8, "big")
+    return base64.urlsafe_b64encode(header + body).decode("ascii").rstrip("=")
+
+
+def decode_share_code(code, expected_sig=None, expected_students=None):
+    # 반환: (order, layout, roster_sig, num_students) / 잘못된 코드는 ValueError
+    # 머리글(배치 모양, 명단)을 먼저 확인하고 나서 순열을 푼다. 순열 풀기는
+    # 학생 수 × 자리 수만큼 걸리므로 조작한 머리글로 큰 계산을 시키지 못하게 한다
+    try:
+        raw = base64.urlsafe_b64decode(code.strip() + "=" * (-len(code.strip()) % 4))
+    except ValueError:
+        raise ValueError("배치 코드가 올바르지 않습니다.")
+
+    if len(raw) < SHARE_HEADER_LEN or raw[0] != SHARE_CODE_VERSION:
+        raise ValueError("지원하지 않는 배치 코드입니다.")
+
+    modes = {v: k for k, v in MODE_CODES.items()}
+    if raw[1] not in modes:
+        raise ValueError("지원하지 않는 배치 코드입니다.")
+
+    mode = modes[raw[1]]
+    rows, bun_dan = raw[2], raw[3]
+    num_students = int.from_bytes(raw[4:6], "big")
+    roster_sig = raw[6:SHARE_HEADER_LEN].hex()
+
+    if not (LAYOUT_MIN <= rows <= LAYOUT_MAX and LAYOUT_MIN <= bun_dan <= LAYOUT_MAX):
+        raise ValueError("배치 코드가 올바르지 않습니다.")
+    if (expected_sig is not None and roster_sig != expected_sig) or (
+        expected_students is not None and num_students != expected_students
+    ):
+        raise ValueError("현재 학생 명단과 맞지 않는 배치 코드입니다.")
+
+    total_seats = rows * seats_per_row(bun_dan, mode)
+    if num_students > total_seats:
+        raise ValueError("배치 코드가 올바르지 않습니다.")
+    # 자리마다 진법은 (남은 학생 + 1) 이하 → 순위 < (학생 수 + 1)! × (학생 수 + 1)^(빈 자리 수).
+    # 그보다 긴 값은 풀어 보지 않고 거른다
+    value = int.from_bytes(raw[SHARE_HEADER_LEN:], "big")
+    max_bits = (math.lgamma(num_students + 2) + (total_seats - num_students) * math.log(num_students + 1)) / math.log(2)
+    if value.bit_length() > max_bits + 1:
+        raise ValueError("배치 코드가 올바르지 않습니다.")
+    order = _unrank_order(value, num_students, total_seats)
+    return order, (rows, bun_dan, mode), roster_sig, num_students
+
+
+# =========================================================
+# 5-3. 이름표 글자 크기 자동 맞춤 (PDF / 이미지 / HTML 공통)
+# =========================================================
+# 칸이 좁으면 글자를 줄이고, 그래도 안 되면 '번호 / 이름' 두 줄로 나눈다.
+# 글자 폭은 (글자, 폰트, 크기)별로 한 번만 재서 모든 세션이 같이 쓴다.
+LABEL_LINE_HEIGHT = 1.15
+TEXT_WIDTH_CACHE_LIMIT = 100_000
+
+
+@st.cache_resource
+def _text_width_cache():
+    return {}
+
+
+TEXT_WIDTHS = _text_width_cache()
+
+
+def text_width(text, font, size):
+    key = (text, font, size)
+    w = TEXT_WIDTHS.get(key)
+    if w is None:
+        if len(TEXT_WIDTHS) >= TEXT_WIDTH_CACHE_LIMIT:
+            TEXT_WIDTHS.clear()
+        w = pdfmetrics.stringWidth(text, font, size)
+        TEXT_WIDTHS[key] = w
+    return w
+
+
+def _split_label(text):
+    # 공백 기준으로 두 줄 중 긴 줄이 가장 짧아지게, 공백이 없으면 글자 수 절반에서
+    words = text.split()
+    if len(words) > 1:
+        candidates = [(" ".join(words[:i]), " ".join(words[i:])) for i in range(1, len(words))]
+    else:
+        half = (len(text) + 1) // 2
+        candidates = [(text[:half], text[half:])]
+    return min(candidates, key=lambda pair: max(len(pair[0]), len(pair[1])))
+
+
+def fit_label(text, font, max_w, max_h, max_size=16, min_size=7):
+    # 반환: (글자 크기, 줄 목록)
+    two_lines = None
+    for size in range(max_size, min_size - 1, -1):
+        if size <= max_h and text_width(text, font, size) <= max_w:
+            return size, [text]
+
+        if len(text) > 1:
+            if two_lines is None:
+                two_lines = list(_split_label(text))
+            fits_h = size * LABEL_LINE_HEIGHT * 2 <= max_h
+            if fits_h and max(text_width(line, font, size) for line in two_lines) <= max_w:
+                return size, two_lines
+
+    return min_size, two_lines or [text]
+
+
+def label_baselines(center_y, size, line_count):
+    # 여러 줄을 칸 가운데에 맞춘 각 줄의 기준선 y (PDF 좌표, 위 줄부터)
+    line_h = size * LABEL_LINE_HEIGHT
+    top = center_y + (line_count - 1) * line_h / 2 - size * 0.31
+    return [top - i * line_h for i in range(line_count)]
+
+
+# =========================================================
+# 5-4. 자리 공정성 (앞뒤 줄 · 구역 누적)
+# =========================================================
+# 저장한 배치마다 학생별로 몇 번째 줄 / 어느 구역에 앉았는지 더해 둔다.
+# 기록을 다시 훑지 않고 저장할 때 한 번만 더하므로 O(자리 수).
+# 깊이는 1줄 = 0, 마지막 줄 = 1. 학생별 평균 깊이가 고를수록 점수가 높다.
+FAIR_MAX_ROWS = 10  # 줄 수 입력의 최댓값 (더 깊은 줄은 마지막 칸에 센다)
+FAIR_ZONES = ["왼쪽", "가운데", "오른쪽"]  # 학생 시야 기준
+FAIR_CANDIDATES = 8  # 공정 배치에서 비교해 볼 후보 수
+FAIR_JITTER = 0.15  # 후보마다 섞는 정도 (평균 깊이 단위)
+
+
+def new_fairness(roster_sig, num_students):
+    return {
+        "counted": set(),  # 이미 더한 버전 번호
+        "saves": 0,
+        "key": roster_sig,  # 더할 때마다 바뀌는 값 (차트 캐시 키)
+        "rows": array("H", [0] * (num_students * FAIR_MAX_ROWS)),
+        "zones": array("H", [0] * (num_students * len(FAIR_ZONES))),
+        "depth": array("d", [0.0] * num_students),
+        "seated": array("H", [0] * num_students),
+    }
+
+
+def _seat_place(seat, layout):
+    # 자리 번호 → (줄, 구역, 깊이)
+    rows, bun_dan, mode = layout
+    cols = seats_per_row(bun_dan, mode)
+    r, c = divmod(seat, cols)
+    group = c // group_size(mode)
+    p = (group + 0.5) / bun_dan
+    zone = 0 if p < 1 / 3 else 2 if p > 2 / 3 else 1
+    return min(r, FAIR_MAX_ROWS - 1), zone, r / (rows - 1)
+
+
+def fairness_add(stats, vid, order, layout, code):
+    if vid in stats["counted"]:
+        return False
+
+    zones = len(FAIR_ZONES)
+    for seat, idx in enumerate(order):
+        if idx == EMPTY_SEAT:
+            continue
+        r, zone, depth = _seat_place(seat, layout)
+        stats["rows"][idx * FAIR_MAX_ROWS + r] += 1
+        stats["zones"][idx * zones + zone] += 1
+        stats["depth"][idx] += depth
+        stats["seated"][idx] += 1
+
+    stats["counted"].add(vid)
+    stats["saves"] += 1
+    stats["key"] = hashlib.sha1(f"{stats['key']}:{code}".encode("utf-8")).hexdigest()[:12]
+    return True
+
+
+def mean_depths(stats):
+    # 학생별 평균 깊이 (아직 앉은 적 없으면 None)
+    return [d / n if n else None for d, n in zip(stats["depth"], stats["seated"])]
+
+
+def fairness_score(stats, order=None, layout=None):
+    # 0~100 (높을수록 공정). order를 주면 그 배치까지 더했다고 보고 계산한다
+    depth = list(stats["depth"])
+    seated = list(stats["seated"])
+    if order is not None:
+        for seat, idx in enumerate(order):
+            if idx != EMPTY_SEAT:
+                depth[idx] += _seat_place(seat, layout)[2]
+                seated[idx] += 1
+
+    means = [d / n for d, n in zip(depth, seated) if n]
+    if len(means) < 2:
+        return None
+    avg = sum(means) / len(means)
+    std = (sum((m - avg) ** 2 for m in means) / len(means)) ** 0.5
+    # 깊이(0~1)의 표준편차는 최대 0.5
+    return round(100 * (1 - 2 * std), 1)
+
+
+def assign_order_fair(stats, num_students, rows, bun_dan, mode, seed=None):
+    # 지금까지 뒤에 많이 앉은 학생부터 앞줄에, 한 줄 안에서는 한쪽에 몰렸던 학생을 반대쪽에.
+    # 조금씩 다르게 섞은 후보 중 fairness_score가 가장 높은 배치를 고른다.
+    rng = random.Random(seed) if seed is not None else random
+    cols = seats_per_row(bun_dan, mode)
     total_seats = rows * cols
-    students = students[:total_seats]
+    zones = len(FAIR_ZONES)
+    means = [m if m is not None else 0.5 for m in mean_depths(stats)]
+    sides = []
+    for idx in range(num_students):
+        counts = stats["zones"][idx * zones:(idx + 1) * zones]
+        total = sum(counts)
+        sides.append((counts[2] - counts[0]) / total if total else 0.0)
+
+    best, best_score = None, None
+    for _ in range(FAIR_CANDIDATES):
+        students = sorted(range(num_students), key=lambda i: -means[i] + rng.uniform(-FAIR_JITTER, FAIR_JITTER))
+        students = students[:total_seats]
+        order = []
+        for r in range(0, len(students), cols):
+            row = students[r:r + cols]
+            # 오른쪽에 많이 앉았던 학생일수록 왼쪽 자리부터
+            row.sort(key=lambda i: -sides[i] + rng.uniform(-0.5, 0.5))
+            order += row
+        order += [EMPTY_SEAT] * (total_seats - len(order))
+
+        score = fairness_score(stats, order, (rows, bun_dan, mode))
+        if best is None or (score is not None and score > best_score):
+            best, best_score = order, score
+    return best
 
-    if mode == "Paired":
-        pairs = []
-        for i in range(0, len(students), 2):
-            s1 = student_to_seat(students[i])
-            s2 = student_to_seat(students[i + 1]) if i + 1 < len(students) else None
-            pairs.append((s1, s2))
-
-        seat_matrix = []
-        idx = 0
-        for _ in range(rows):
-            row = []
-            for _ in range(bun_dan):
-                if idx < len(pairs):
-                    s1, s2 = pairs[idx]
-                    row.append(s1)
-                    row.append(s2)
-                else:
-                    row.append(None)
-                    row.append(None)
-                idx += 1
-            seat_matrix.append(row)
-        return seat_matrix
 
+# =========================================================
+# 5-5. 모둠 구성 (성별 · 수준 고르게)
+# =========================================================
+# 1) 성별마다 모둠별 몫(인원)을 먼저 정한다. 나누고 남는 1명씩은 자리가 많이 남은
+#    모둠부터 주므로 어느 성별이든 모둠끼리 1명 이내로 같고, 마지막 성별까지 자리가
+#    딱 맞는다. 그다음 성별별로 수준 높은 순으로 줄 세워 몫이 찬 모둠은 건너뛰며
+#    지그재그로 나눠 준다 (1→n, n→1, ...; 성별이 바뀌어도 이어서).
+# 2) 수준 합이 가장 높은 모둠과 낮은 모둠 사이에서 비용이 줄어드는 맞바꾸기를
+#    더는 없을 때까지 한다. 비용 = Σ(모둠 수준 합 - 목표)² + Σ(모둠 성별 수 - 목표)²
+#    성별 수가 1명 넘게 벌어지는 맞바꾸기는 하지 않는다.
+#    한 번에 O(모둠 수 + 인원²)라서 학생 수백 명도 금방 끝난다.
+GROUP_JITTER = 0.3  # 같은 수준끼리 섞이도록 흔드는 정도 (표준편차 단위)
+GROUP_SWAP_STEPS = 20  # 모둠 수 × 이 값까지만 맞바꾼다
+GROUP_SWAP_PARTNERS = 4  # 한 번에 맞바꿔 볼 상대 모둠 수 (수준 합 낮은 순)
+GENDER_KEYS = ["남", "여", None]
+
+
+def student_gender(student):
+    # "남" / "여" / None
+    for col in GENDER_COLUMNS:
+        value = student.get(col)
+        if value not in (None, ""):
+            return GENDER_VALUES.get(str(value).strip().lower())
+    return None
+
+
+def student_ability(student):
+    # 수준 (숫자) / 없으면 None
+    for col in ABILITY_COLUMNS:
+        value = student.get(col)
+        if value in (None, ""):
+            continue
+        value = ABILITY_LEVELS.get(str(value).strip(), value)
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return None
+        return value if value == value else None  # NaN
+    return None
+
+
+def balanced_teams(genders, abilities, members, team_count, rng=random):
+    # members(학생 인덱스)를 team_count개 모둠으로. 모둠 인원도, 성별마다 인원도 1명 이내로 같다
+    known = [abilities[i] for i in members if abilities[i] is not None]
+    mean = sum(known) / len(known) if known else 0.0
+    sd = (sum((a - mean) ** 2 for a in known) / len(known)) ** 0.5 if known else 0.0
+    sd = sd or 1.0
+    # 수준 없는 학생은 가운데(0)로 친다
+    z = {i: (abilities[i] - mean) / sd if abilities[i] is not None else 0.0 for i in members}
+    gender = {i: GENDER_KEYS.index(genders[i]) for i in members}
+
+    base, extra = divmod(len(members), team_count)
+    sizes = [base + (1 if t < extra else 0) for t in range(team_count)]
+    teams = [[] for _ in range(team_count)]
+
+    # ---------- 1) 지그재그로 나눠 주기 ----------
+    shaky = {i: z[i] + rng.gauss(0, GROUP_JITTER) for i in members}
+    ranked = [
+        sorted((i for i in members if gender[i] == g), key=lambda i: -shaky[i])
+        for g in range(len(GENDER_KEYS))
+    ]
+    room = sizes[:]
+    quota = []  # quota[g][t]: 모둠 t에 들어갈 성별 g 인원
+    for group in ranked:
+        q, e = divmod(len(group), team_count)
+        share_g = [q] * team_count
+        for t in sorted(range(team_count), key=lambda t: (-room[t], rng.random()))[:e]:
+            share_g[t] += 1
+        room = [r - n for r, n in zip(room, share_g)]
+        quota.append(share_g)
+
+    count = [[0] * len(GENDER_KEYS) for _ in range(team_count)]
+    snake = list(range(team_count)) + list(range(team_count - 1, -1, -1))
+    step = 0
+    for g, group in enumerate(ranked):
+        for i in group:
+            while count[snake[step % len(snake)]][g] >= quota[g][snake[step % len(snake)]]:
+                step += 1
+            t = snake[step % len(snake)]
+            teams[t].append(i)
+            count[t][g] += 1
+            step += 1
+
+    # ---------- 2) 맞바꾸기 ----------
+    share = [sum(1 for i in members if gender[i] == g) / len(members) for g in range(len(GENDER_KEYS))]
+    target = sum(z.values()) / len(members)
+    dev = [sum(z[i] for i in team) - len(team) * target for team in teams]
+    off = [
+        [sum(1 for i in team if gender[i] == g) - len(team) * share[g] for g in range(len(GENDER_KEYS))]
+        for team in teams
+    ]
+
+    for _ in range(GROUP_SWAP_STEPS * team_count):
+        a = max(range(team_count), key=dev.__getitem__)
+        partners = sorted(range(team_count), key=dev.__getitem__)[:GROUP_SWAP_PARTNERS]
+        best = None
+        for b in partners:
+            if b == a:
+                continue
+            for x in teams[a]:
+                for y in teams[b]:
+                    d = z[y] - z[x]
+                    change = 2 * d * (dev[a] - dev[b]) + 2 * d * d
+                    gx, gy = gender[x], gender[y]
+                    if gx != gy:
+                        # 성별 수는 모둠끼리 1명 이내 -> 많은 쪽에서 적은 쪽으로만 옮길 수 있다
+                        if count[a][gx] <= count[b][gx] or count[b][gy] <= count[a][gy]:
+                            continue
+                        change += 4 + 2 * (off[a][gy] - off[a][gx] + off[b][gx] - off[b][gy])
+                    if change < -1e-9 and (best is None or change < best[0]):
+                        best = (change, b, x, y)
+        if best is None:
+            break
+
+        _, b, x, y = best
+        teams[a][teams[a].index(x)] = y
+        teams[b][teams[b].index(y)] = x
+        d = z[y] - z[x]
+        dev[a] += d
+        dev[b] -= d
+        gx, gy = gender[x], gender[y]
+        if gx != gy:
+            for row in (off, count):
+                row[a][gx] -= 1
+                row[a][gy] += 1
+                row[b][gy] -= 1
+                row[b][gx] += 1
+    return teams
+
+
+def assign_order_groups(student_list, rows, bun_dan, mode, seed=None, stats=None):
+    # 모둠 모드 배치. stats(자리 공정성)를 주면 뒤쪽에 많이 앉았던 모둠을 앞줄에
+    rng = random.Random(seed) if seed is not None else random
+    size = group_size(mode)
+    total_seats = rows * seats_per_row(bun_dan, mode)
+    members = list(range(len(student_list)))
+    rng.shuffle(members)
+    members = members[:total_seats]
+    if not members:
+        return [EMPTY_SEAT] * total_seats
+
+    genders = [student_gender(s) for s in student_list]
+    abilities = [student_ability(s) for s in student_list]
+    teams = balanced_teams(genders, abilities, members, -(-len(members) // size), rng)
+
+    if stats is not None:
+        means = [m if m is not None else 0.5 for m in mean_depths(stats)]
+        teams.sort(key=lambda team: -sum(means[i] for i in team) / len(team) + rng.uniform(-FAIR_JITTER, FAIR_JITTER))
     else:
-        seat_matrix = []
-        idx = 0
-        for _ in range(rows):
-            row = []
-            for _ in range(cols):
-                if idx < len(students):
-                    row.append(student_to_seat(students[idx]))
-                else:
-                    row.append(None)
-                idx += 1
-            seat_matrix.append(row)
-        return seat_matrix
+        rng.shuffle(teams)
+
+    order = []
+    for team in teams:
+        rng.shuffle(team)
+        order += team + [EMPTY_SEAT] * (size - len(team))
+    order += [EMPTY_SEAT] * (total_seats - len(order))
+    return order
+
+
+def group_summary(student_list, order, layout):
+    # 모둠별 인원 · 성별 · 평균 수준 (화면 표)
+    _, _, mode = layout
+    size = group_size(mode)
+    rows = []
+    for start in range(0, len(order), size):
+        team = [student_list[idx] for idx in order[start:start + size] if idx != EMPTY_SEAT]
+        if not team:
+            continue
+        genders = [student_gender(s) for s in team]
+        abilities = [a for a in (student_ability(s) for s in team) if a is not None]
+        rows.append({
+            "모둠": f"{start // size + 1}모둠",
+            "인원": len(team),
+            "남": genders.count("남"),
+            "여": genders.count("여"),
+            "평균 수준": round(sum(abilities) / len(abilities), 2) if abilities else None,
+            "학생": ", ".join(student_to_seat(s)["name"] for s in team),
+        })
+    return pd.DataFrame(rows)
 
 
 # =========================================================
@@ -243,6 +1598,9 @@ HTML_STYLE = """
         font-weight: bold;
         text-align: center;
         font-size: 15px;
+        line-height: 1.15;
+        word-break: keep-all;
+        overflow: hidden;
         padding: 4px;
         border: 2px solid #555;
     }
@@ -265,22 +1623,64 @@ HTML_STYLE = """
 """
 
 
-def render_chart(matrix, view_mode, bun_dan, seating_mode):
+# .desk 안쪽 글자 영역 (px). 화면 글꼴은 브라우저마다 달라서 굵은 글씨 여유를 둔다.
+DESK_TEXT_W = 112 * 0.9
+DESK_TEXT_H = 54
+
+
+NO_DESK = "no-desk"  # 모둠 인원이 홀수일 때 비는 칸 (책상 없음, 그리지 않음)
+
+
+def desk_grid(matrix, seating_mode, view_mode):
+    # matrix(줄 × 자리)를 그리는 순서의 칸 격자로. 반환: (격자, 묶음 가로 칸, 묶음 세로 칸)
+    # Single / Paired는 matrix 그대로, 모둠은 한 모둠을 2줄로 펼친다 (앞쪽 절반이 윗줄)
+    block_w, block_h = desk_block(seating_mode)
+    if block_h > 1:
+        size = group_size(seating_mode)
+        grid = []
+        for row in matrix:
+            teams = [row[k:k + size] for k in range(0, len(row), size)]
+            for h in range(block_h):
+                line = []
+                for team in teams:
+                    cells = team[h * block_w:(h + 1) * block_w]
+                    line += cells + [NO_DESK] * (block_w - len(cells))
+                grid.append(line)
+    else:
+        grid = matrix
+
     if view_mode == "teacher":
-        matrix = matrix[::-1]
+        grid = grid[::-1]
+    return grid, block_w, block_h
+
+
+def render_chart(matrix, view_mode, bun_dan, seating_mode):
+    grid, block_w, block_h = desk_grid(matrix, seating_mode, view_mode)
 
-    cols = len(matrix[0])
-    extra_pairs = (cols // 2 - 1) if seating_mode == "Paired" else 0
-    grid_cols = cols + max(0, extra_pairs)
+    cols = len(grid[0])
+    extra_blocks = (cols // block_w - 1) if block_w > 1 else 0
+    grid_cols = cols + max(0, extra_blocks)
 
     html = f'<div class="desk-grid" style="grid-template-columns: repeat({grid_cols}, auto);">'
 
-    for row in matrix:
+    for r, row in enumerate(grid):
+        # 모둠 줄 사이 간격
+        if block_h > 1 and r and r % block_h == 0:
+            html += '<div style="grid-column:1/-1;height:10px;"></div>'
+
         for i, desk in enumerate(row):
             classes = "desk"
-            if desk:
-                style = f"background-color:{desk['color']};border-color:{desk['color']};"
-                name = desk["name"]
+            if desk is NO_DESK:
+                classes = ""
+                style = ""
+                name = ""
+            elif desk:
+                size, lines = fit_label(desk["name"], KOREAN_FONT, DESK_TEXT_W, DESK_TEXT_H, max_size=15, min_size=9)
+                style = (
+                    f"background-color:{desk['color']};border-color:{desk['color']};"
+                    f"font-size:{size}px;"
+                )
+                name = "<br>".join(lines)
             else:
                 classes += " empty-desk"
                 style = ""
@@ -288,8 +1688,8 @@ def render_chart(matrix, view_mode, bun_dan, seating_mode):
 
             html += f'<div class="{classes}" style="{style}">{name}</div>'
 
-            # 짝 책상 사이 간격
-            if seating_mode == "Paired" and i % 2 == 1 and i != len(row) - 1:
+            # 짝 / 모둠 책상 사이 간격
+            if block_w > 1 and i % block_w == block_w - 1 and i != len(row) - 1:
                 html += '<div style="width:20px;"></div>'
 
     html += "</div>"
@@ -299,24 +1699,33 @@ def render_chart(matrix, view_mode, bun_dan, seating_mode):
 # =========================================================
 # 7. PDF 생성 (중앙 정렬 + 교사용/학생용 레이아웃)
 # =========================================================
-def draw_pdf_page(c, matrix, seating_mode, view_mode, bun_dan, title):
-    width, height = landscape(A4)
+PAGE_SIZE = landscape(A4)
+TABLE_PAD = 6  # 모둠 책상 묶음 테두리 여백 (pt)
+TABLE_COLOR = "#f3f4f6"
+TABLE_EDGE_COLOR = "#9ca3af"
+
+
+def chart_layout(matrix, seating_mode, view_mode, bun_dan):
+    # PDF/이미지가 함께 쓰는 좌표 (단위 pt, 왼쪽 아래가 원점)
+    width, height = PAGE_SIZE
 
     margin_y = 80
     gap_x = 10
     gap_y = 18
-    pair_gap = 22 if seating_mode == "Paired" else 0
+    block_w, block_h = desk_block(seating_mode)
+    pair_gap = 22 if block_w > 1 else 0
+    group_gap = 0
+    if block_h > 1:
+        # 모둠: 한 모둠 책상은 붙여 놓고 모둠 사이를 띄운다
+        gap_x = gap_y = 4
+        group_gap = 22
 
     # ---------- 1) 행 순서 (교사용/학생용) ----------
-    if view_mode == "teacher":
-        # 교탁 기준: 앞줄이 아래에 오도록 뒤집어서
-        matrix_to_draw = matrix[::-1]
-    else:
-        # 학생용: 앞줄이 위에 보이도록 그대로
-        matrix_to_draw = matrix
+    # 교사용: 교탁 기준으로 앞줄이 아래에 오도록 뒤집어서 / 학생용: 앞줄이 위에 보이도록 그대로
+    grid, block_w, block_h = desk_grid(matrix, seating_mode, view_mode)
 
-    rows = len(matrix_to_draw)
-    cols = len(matrix_to_draw[0])
+    rows = len(grid)
+    cols = len(grid[0])
 
     # ---------- 2) 제목 위치 ----------
     if view_mode == "teacher":
@@ -326,15 +1735,13 @@ def draw_pdf_page(c, matrix, seating_mode, view_mode, bun_dan, title):
         # 학생용: 아래쪽에 제목
         title_y = margin_y / 2
 
-    c.setFont(KOREAN_FONT, 26)
-    c.drawCentredString(width / 2, title_y, title)
-
     # ---------- 3) 좌석 영역 계산 (가운데 정렬) ----------
     available_h = height - margin_y * 2 - 80
-    cell_h = (available_h - gap_y * (rows - 1)) / rows if rows > 0 else 40
+    total_group_gaps = (rows // block_h - 1) * group_gap
+    cell_h = (available_h - gap_y * (rows - 1) - total_group_gaps) / rows if rows > 0 else 40
 
     total_base_gaps = (cols - 1) * gap_x
-    total_pair_gaps = (bun_dan - 1) * pair_gap if seating_mode == "Paired" else 0
+    total_pair_gaps = (cols // block_w - 1) * pair_gap if block_w > 1 else 0
 
     available_w = width - 80  # 양쪽 대략 40pt 여백
     cell_w = (available_w - total_base_gaps - total_pair_gaps) / cols if cols > 0 else 40
@@ -345,32 +1752,24 @@ def draw_pdf_page(c, matrix, seating_mode, view_mode, bun_dan, title):
     # 세로 시작점: 위에서 아래로
     start_y = height - margin_y - cell_h-30
 
-    # ---------- 4) 좌석 사각형/이름 그리기 ----------
-    for r, row in enumerate(matrix_to_draw):
-        y = start_y - r * (cell_h + gap_y)
+    # ---------- 4) 좌석 사각형 위치 ----------
+    cells = []
+    tables = []  # 모둠 책상 묶음 (x, y, w, h)
+    for r, row in enumerate(grid):
+        y = start_y - r * (cell_h + gap_y) - (r // block_h) * group_gap
         x = start_x
 
         for c_idx, desk in enumerate(row):
-            if desk:
-                c.setFillColor(HexColor(desk["color"]))
-                c.setStrokeColor(HexColor(desk["color"]))
-            else:
-                c.setFillColor(HexColor("#e0e7ff"))
-                c.setStrokeColor(HexColor("#d1d5db"))
-
-            c.rect(x, y, cell_w, cell_h, fill=1, stroke=1)
-
-            c.setFillColor(black)
-            if desk:
-                c.setFont(KOREAN_FONT, 16)
-                c.drawCentredString(x + cell_w / 2, y + cell_h / 2 - 5, desk["name"])
-            else:
-                c.setFont(KOREAN_FONT, 14)
-                c.drawCentredString(x + cell_w / 2, y + cell_h / 2 - 5, "빈 자리")
+            if desk is not NO_DESK:
+                cells.append((x, y, desk))
+            if block_h > 1 and r % block_h == block_h - 1 and c_idx % block_w == 0:
+                block_width = block_w * cell_w + (block_w - 1) * gap_x
+                block_height = block_h * cell_h + (block_h - 1) * gap_y
+                tables.append((x, y, block_width, block_height))
 
             x += cell_w + gap_x
 
-            if seating_mode == "Paired" and c_idx % 2 == 1 and c_idx != cols - 1:
+            if block_w > 1 and c_idx % block_w == block_w - 1 and c_idx != cols - 1:
                 x += pair_gap
 
     # ---------- 5) 교탁 위치 ----------
@@ -385,6 +1784,59 @@ def draw_pdf_page(c, matrix, seating_mode, view_mode, bun_dan, title):
         # 학생용: 교탁은 맨 위 중앙 (앞쪽)
         desk_y = height - margin_y + 10
 
+    return {
+        "width": width,
+        "height": height,
+        "title_y": title_y,
+        "cell_w": cell_w,
+        "cell_h": cell_h,
+        "cells": cells,
+        "tables": tables,
+        "lectern": (desk_x, desk_y, desk_w, desk_h),
+    }
+
+
+def draw_pdf_page(c, matrix, seating_mode, view_mode, bun_dan, title):
+    layout = chart_layout(matrix, seating_mode, view_mode, bun_dan)
+    width = layout["width"]
+    cell_w = layout["cell_w"]
+    cell_h = layout["cell_h"]
+
+    c.setFont(KOREAN_FONT, 26)
+    c.drawCentredString(width / 2, layout["title_y"], title)
+
+    # ---------- 모둠 책상 묶음 ----------
+    if layout["tables"]:
+        c.setFillColor(HexColor(TABLE_COLOR))
+        c.setStrokeColor(HexColor(TABLE_EDGE_COLOR))
+        for x, y, w, h in layout["tables"]:
+            c.roundRect(x - TABLE_PAD, y - TABLE_PAD, w + 2 * TABLE_PAD, h + 2 * TABLE_PAD, TABLE_PAD, fill=1, stroke=1)
+
+    # ---------- 좌석 사각형/이름 그리기 ----------
+    for x, y, desk in layout["cells"]:
+        if desk:
+            c.setFillColor(HexColor(desk["color"]))
+            c.setStrokeColor(HexColor(desk["color"]))
+        else:
+            c.setFillColor(HexColor("#e0e7ff"))
+            c.setStrokeColor(HexColor("#d1d5db"))
+
+        c.rect(x, y, cell_w, cell_h, fill=1, stroke=1)
+
+        c.setFillColor(black)
+        if desk:
+            size, lines = fit_label(desk["name"], KOREAN_FONT, cell_w - min(8, cell_w * 0.1), cell_h - 4)
+            c.setFont(KOREAN_FONT, size)
+            for line, baseline in zip(lines, label_baselines(y + cell_h / 2, size, len(lines))):
+                c.drawCentredString(x + cell_w / 2, baseline, line)
+        else:
+            size, lines = fit_label("빈 자리", KOREAN_FONT, cell_w - min(8, cell_w * 0.1), cell_h - 4, max_size=14)
+            c.setFont(KOREAN_FONT, size)
+            for line, baseline in zip(lines, label_baselines(y + cell_h / 2, size, len(lines))):
+                c.drawCentredString(x + cell_w / 2, baseline, line)
+
+    # ---------- 교탁 ----------
+    desk_x, desk_y, desk_w, desk_h = layout["lectern"]
     c.setFillColor(HexColor("#eff6ff"))
     c.setStrokeColor(HexColor("#2563eb"))
     c.rect(desk_x, desk_y, desk_w, desk_h, fill=1, stroke=1)
@@ -395,7 +1847,7 @@ def draw_pdf_page(c, matrix, seating_mode, view_mode, bun_dan, title):
 
 def make_pdf(matrix, seating_mode, view_mode, bun_dan, title):
     buf = io.BytesIO()
-    c = canvas.Canvas(buf, pagesize=landscape(A4))
+    c = canvas.Canvas(buf, pagesize=PAGE_SIZE)
     draw_pdf_page(c, matrix, seating_mode, view_mode, bun_dan, title)
     c.showPage()
     c.save()
@@ -405,7 +1857,7 @@ def make_pdf(matrix, seating_mode, view_mode, bun_dan, title):
 
 def make_pdf_both(matrix, seating_mode, bun_dan):
     buf = io.BytesIO()
-    c = canvas.Canvas(buf, pagesize=landscape(A4))
+    c = canvas.Canvas(buf, pagesize=PAGE_SIZE)
 
     draw_pdf_page(c, matrix, seating_mode, "teacher", bun_dan, "교사용 좌석 배치표")
     c.showPage()
@@ -418,58 +1870,877 @@ def make_pdf_both(matrix, seating_mode, bun_dan):
     return buf.getvalue()
 
 
+# ---------- 파일로 바로 쓰기 (큰 묶음용) ----------
+# BytesIO → getvalue() 복사 → download_button 보관, 이렇게 세 벌이 메모리에 남지 않도록
+# 페이지를 generator로 하나씩 그려 임시 파일에 바로 저장하고, 다운로드도 파일에서 읽는다.
+PDF_DIR = os.path.join(tempfile.gettempdir(), "myclass_pdf")
+PDF_DIR_LIMIT = 300  # 보관할 PDF 파일 수
+# 이보다 큰 PDF는 파일에만 두고 누를 때마다 파일에서 읽어 보낸다. 메모리 저장소와
+# 상태 저장소에 한 벌씩 더 두지 않는다 (같은 컴퓨터의 워커는 같은 파일을 쓴다)
+PDF_STORE_MAX_BYTES = int(os.environ.get("MYCLASS_PDF_STORE_KB", "1024")) * 1024
+PDF_LAYOUT_VERSION = 2  # 그리는 방식이 바뀌면 올려서 예전 파일을 쓰지 않게
+
+
+def write_pdf(path, pages):
+    # pages: draw_pdf_page 인자 (matrix, seating_mode, view_mode, bun_dan, title) 를 하나씩 내주는 iterable
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+    try:
+        c = canvas.Canvas(tmp_path, pagesize=PAGE_SIZE)
+        for page in pages:
+            draw_pdf_page(c, *page)
+            c.showPage()
+        c.save()
+        os.replace(tmp_path, path)  # 다 쓴 파일만 보이도록
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+def _prune_pdf_dir():
+    try:
+        paths = [os.path.join(PDF_DIR, name) for name in os.listdir(PDF_DIR) if name.endswith(".pdf")]
+    except FileNotFoundError:
+        return
+    if len(paths) <= PDF_DIR_LIMIT:
+        return
+    paths.sort(key=os.path.getmtime)
+    for path in paths[:len(paths) - PDF_DIR_LIMIT]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+PDF_KINDS = {
+    "teacher": [("teacher", "교사용 좌석 배치표")],
+    "student": [("student", "학생용 좌석 배치표")],
+    "both": [("teacher", "교사용 좌석 배치표"), ("student", "학생용 좌석 배치표")],
+}
+
+
+def pdf_file(share_code, kind, matrix, seating_mode, bun_dan):
+    # 공유 코드가 같으면 (명단·배치·설정이 같으면) 이미 만든 파일을 그대로 쓴다
+    path = os.path.join(PDF_DIR, f"{share_code}_{kind}_v{PDF_LAYOUT_VERSION}.pdf")
+    with perf_stage("pdf", kind=kind) as m:
+        m["cache_hit"] = os.path.exists(path)
+        if not m["cache_hit"]:
+            pages = (
+                (matrix, seating_mode, view_mode, bun_dan, title)
+                for view_mode, title in PDF_KINDS[kind]
+            )
+            write_pdf(path, pages)
+            _prune_pdf_dir()
+        m["bytes"] = os.path.getsize(path)
+    return path
+
+
+def small_pdf(data):
+    return len(data) <= PDF_STORE_MAX_BYTES
+
+
+def pdf_bytes(share_code, kind, matrix, seating_mode, bun_dan):
+    def build():
+        with open(pdf_file(share_code, kind, matrix, seating_mode, bun_dan), "rb") as f:
+            return f.read()
+
+    data, _ = store_cached("pdf", f"{share_code}_{kind}_v{PDF_LAYOUT_VERSION}", build, keep=small_pdf)
+    return data
+
+
+# =========================================================
+# 7-1. 이미지 내보내기 (PNG / SVG, 메신저·교실 TV용)
+# =========================================================
+# chart_layout 좌표를 그대로 matplotlib에 옮겨 그린다 (1pt = 1/72인치).
+# 결과는 (배치 + 시야 + 형식/해상도)의 해시로 프로세스 전체에서 캐시한다.
+IMAGE_FORMATS = {
+    "PNG · 화면용 (96dpi)": ("png", 96),
+    "PNG · TV용 (150dpi)": ("png", 150),
+    "PNG · 인쇄용 (300dpi)": ("png", 300),
+    "SVG": ("svg", 72),
+}
+
+
+def _image_font():
+    if FONT_PATH and KOREAN_FONT != "Helvetica":
+        return font_manager.FontProperties(fname=FONT_PATH)
+    return font_manager.FontProperties()
+
+
+def render_chart_image(matrix, seating_mode, view_mode, bun_dan, title, fmt="png", dpi=150):
+    layout = chart_layout(matrix, seating_mode, view_mode, bun_dan)
+    width = layout["width"]
+    height = layout["height"]
+    cell_w = layout["cell_w"]
+    cell_h = layout["cell_h"]
+    font = _image_font()
+
+    fig = Figure(figsize=(width / 72, height / 72), dpi=dpi)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_xlim(0, width)
+    ax.set_ylim(0, height)
+    ax.axis("off")
+
+    ax.text(width / 2, layout["title_y"], title, fontproperties=font, fontsize=26, ha="center", va="baseline")
+
+    for x, y, w, h in layout["tables"]:
+        ax.add_patch(Rectangle(
+            (x - TABLE_PAD, y - TABLE_PAD), w + 2 * TABLE_PAD, h + 2 * TABLE_PAD,
+            facecolor=TABLE_COLOR, edgecolor=TABLE_EDGE_COLOR, linewidth=1,
+        ))
+
+    for x, y, desk in layout["cells"]:
+        if desk:
+            face, edge = desk["color"], desk["color"]
+            size, lines = fit_label(desk["name"], KOREAN_FONT, cell_w - min(8, cell_w * 0.1), cell_h - 4)
+        else:
+            face, edge = "#e0e7ff", "#d1d5db"
+            size, lines = fit_label("빈 자리", KOREAN_FONT, cell_w - min(8, cell_w * 0.1), cell_h - 4, max_size=14)
+        ax.add_patch(Rectangle((x, y), cell_w, cell_h, facecolor=face, edgecolor=edge, linewidth=1))
+        ax.text(
+            x + cell_w / 2, y + cell_h / 2, "\n".join(lines),
+            fontproperties=font, fontsize=size, ha="center", va="center", color="black",
+            linespacing=LABEL_LINE_HEIGHT,
+        )
+
+    desk_x, desk_y, desk_w, desk_h = layout["lectern"]
+    ax.add_patch(Rectangle((desk_x, desk_y), desk_w, desk_h, facecolor="#eff6ff", edgecolor="#2563eb", linewidth=1))
+    ax.text(
+        desk_x + desk_w / 2, desk_y + desk_h / 2, "교탁",
+        fontproperties=font, fontsize=18, ha="center", va="center", color="#2563eb",
+    )
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, dpi=dpi, facecolor="white")
+    return buf.getvalue()
+
+
+def chart_image(matrix, seating_mode, view_mode, bun_dan, title, fmt="png", dpi=150):
+    key = content_key(matrix, seating_mode, view_mode, bun_dan, title, fmt, dpi)
+    with perf_stage("chart_image", fmt=fmt, dpi=dpi) as m:
+        data, m["cache_hit"] = store_cached(
+            "image",
+            key,
+            lambda: render_chart_image(matrix, seating_mode, view_mode, bun_dan, title, fmt, dpi),
+        )
+        m["bytes"] = len(data)
+    return data
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def fairness_chart(stats_key, _stats, _labels, dpi=110):
+    # 학생별 줄 / 구역 횟수 차트 (PNG). stats_key는 배치가 새로 저장될 때만 바뀐다
+    n = len(_labels)
+    used_rows = max(
+        (r + 1 for r in range(FAIR_MAX_ROWS) if any(_stats["rows"][i * FAIR_MAX_ROWS + r] for i in range(n))),
+        default=1,
+    )
+    row_counts = [list(_stats["rows"][i * FAIR_MAX_ROWS:i * FAIR_MAX_ROWS + used_rows]) for i in range(n)]
+    zones = len(FAIR_ZONES)
+    zone_counts = [_stats["zones"][i * zones:(i + 1) * zones] for i in range(n)]
+    font = _image_font()
+
+    fig = Figure(figsize=(10, max(3, 0.24 * n + 1.2)), dpi=dpi)
+    ax_rows, ax_zones = fig.subplots(1, 2, sharey=True, gridspec_kw={"width_ratios": [3, 2]})
+
+    image = ax_rows.imshow(row_counts, aspect="auto", cmap="Blues", vmin=0)
+    ax_rows.set_xticks(range(used_rows), [f"{r + 1}줄" for r in range(used_rows)], fontproperties=font)
+    ax_rows.set_yticks(range(n), _labels, fontproperties=font, fontsize=8)
+    ax_rows.set_title("줄별 앉은 횟수 (1줄 = 교탁 앞)", fontproperties=font)
+    fig.colorbar(image, ax=ax_rows, fraction=0.04, pad=0.02)
+
+    left = [0] * n
+    for z, (zone, color) in enumerate(zip(FAIR_ZONES, ["#93c5fd", "#d1d5db", "#fca5a5"])):
+        counts = [c[z] for c in zone_counts]
+        ax_zones.barh(range(n), counts, left=left, color=color, label=zone)
+        left = [a + b for a, b in zip(left, counts)]
+    ax_zones.set_title("구역별 앉은 횟수 (학생 시야)", fontproperties=font)
+    ax_zones.legend(prop=font, loc="upper center", bbox_to_anchor=(0.5, -0.05), ncol=len(FAIR_ZONES), frameon=False)
+
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=dpi, facecolor="white")
+    return buf.getvalue()
+
+
+# =========================================================
+# 7-2. 배치 기록을 Google 시트에 남기기 (선택)
+# =========================================================
+# 명단 시트와 같은 스프레드시트의 '자리배치 기록' 워크시트에 배치마다 한 줄씩 쓴다.
+# 저장할 때마다 아직 안 올린 버전을 모아 append_rows 한 번으로 보낸다
+# (학생 수나 버전 수와 상관없이 저장 1번 = API 쓰기 1번).
+ARRANGEMENT_SHEET = "자리배치 기록"
+ARRANGEMENT_HEADER = ["저장 시각", "이름", "버전", "배치 코드", "좌석 형태", "줄 수", "분단 수", "학생 수", "배치"]
+SHEETS_WRITE_SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+
+
+@st.cache_resource(show_spinner=False)
+def _arrangement_sheet():
+    # 쓰기 권한 클라이언트와 워크시트는 한 번만 연다 (모든 세션 공용)
+    creds = Credentials.from_service_account_info(
+        st.secrets["gcp_service_account"],
+        scopes=SHEETS_WRITE_SCOPES,
+    )
+    sh = gspread.authorize(creds).open_by_key(SPREADSHEET_ID)
+    try:
+        ws = sh.worksheet(ARRANGEMENT_SHEET)
+        needs_header = False
+    except gspread.exceptions.WorksheetNotFound:
+        ws = sh.add_worksheet(ARRANGEMENT_SHEET, rows=1, cols=len(ARRANGEMENT_HEADER))
+        needs_header = True
+    return {"lock": threading.Lock(), "ws": ws, "needs_header": needs_header}
+
+
+def arrangement_text(student_list, order, layout):
+    # 사람이 시트에서 바로 읽을 수 있게 줄마다 '번호 이름'을 늘어놓는다
+    # (모둠 모드는 모둠마다 한 줄)
+    _, bun_dan, mode = layout
+    cols = group_size(mode) if is_group_mode(mode) else seats_per_row(bun_dan, mode)
+    unit = "모둠" if is_group_mode(mode) else "줄"
+    lines = []
+    for r in range(0, len(order), cols):
+        names = [
+            student_to_seat(student_list[idx])["name"] if idx != EMPTY_SEAT else "-"
+            for idx in order[r:r + cols]
+        ]
+        lines.append(f"{r // cols + 1}{unit}: " + ", ".join(names))
+    return "\n".join(lines)
+
+
+def arrangement_row(history, vid, student_list, saved_at):
+    order = history_order(history, vid)
+    layout = history_layout(history, vid)
+    rows, bun_dan, mode = layout
+    names = [name for name, v in history["saved"].items() if v == vid]
+    return [
+        saved_at,
+        ", ".join(names),
+        vid + 1,
+        encode_share_code(order, layout, history["roster"], len(student_list)),
+        mode,
+        rows,
+        bun_dan,
+        len(student_list),
+        arrangement_text(student_list, order, layout),
+    ]
+
+
+def write_arrangements(history, student_list, vids):
+    # 반환: 기록한 줄 수. 실패하면 예외 (gspread / secrets)
+    if not vids:
+        return 0
+
+    saved_at = time.strftime("%Y-%m-%d %H:%M:%S")
+    values = [arrangement_row(history, vid, student_list, saved_at) for vid in vids]
+
+    sheet = _arrangement_sheet()
+    with perf_stage("sheets_write", rows=len(values)):
+        with sheet["lock"]:
+            if sheet["needs_header"]:
+                values.insert(0, ARRANGEMENT_HEADER)
+            sheet["ws"].append_rows(values, value_input_option="RAW")
+            sheet["needs_header"] = False
+    history["uploaded"].update(vids)
+    return len(vids)
+
+
+# =========================================================
+# 7-3. 책상 이름표 · 자리 순 출석부 (학년 전체 한 번에)
+# =========================================================
+# 한 캔버스에 여러 반을 이어서 그린다. 카드 테두리/접는 선, 출석부 표 같은
+# 매번 똑같은 부분은 PDF Form(XObject)으로 한 번만 만들어 두고 doForm으로 찍는다.
+# classes: (제목, seat_entries 결과) 를 하나씩 내주는 iterable
+CARD_PAGE_SIZE = A4
+CARD_COLS, CARD_ROWS = 2, 4  # A4 한 장에 8장 (접으면 세워 두는 이름표)
+CARD_MARGIN = 18
+ATTENDANCE_DAYS = ["월", "화", "수", "목", "금"]
+ATTENDANCE_ROWS = 30  # 출석부 한 쪽의 줄 수
+ATTENDANCE_COLS = [("자리", 70), ("번호 이름", 150)] + [(day, 42) for day in ATTENDANCE_DAYS] + [("비고", 0)]
+
+
+def seat_entries(student_list, order, layout):
+    # 자리 순(앞줄 왼쪽부터) 학생 목록: (자리 이름, '번호 이름', 색)
+    entries = []
+    for seat, idx in enumerate(order):
+        if idx == EMPTY_SEAT:
+            continue
+        desk = student_to_seat(student_list[idx])
+        entries.append((seat_position_label(seat, layout), desk["name"], desk["color"]))
+    return entries
+
+
+CARD_CAPTION_COLOR = HexColor("#6b7280")
+
+
+def _card_size():
+    width, height = CARD_PAGE_SIZE
+    return (
+        (width - CARD_MARGIN * 2) / CARD_COLS,
+        (height - CARD_MARGIN * 2) / CARD_ROWS,
+    )
+
+
+def _card_template(c):
+    # 카드 한 장의 바탕: 자르는 선 + 가운데 접는 선
+    card_w, card_h = _card_size()
+    c.beginForm("namecard", lowerx=0, lowery=0, upperx=card_w, uppery=card_h)
+    c.setStrokeColor(HexColor("#9ca3af"))
+    c.setLineWidth(0.5)
+    c.rect(0, 0, card_w, card_h, fill=0, stroke=1)
+    c.setDash(3, 3)
+    c.line(0, card_h / 2, card_w, card_h / 2)
+    c.endForm()
+
+
+def _draw_card_face(c, card_w, face_h, title, seat, label, color):
+    # 접었을 때 한쪽 면 (아래 절반 기준 좌표). label: fit_label 결과
+    c.setFillColor(color)
+    c.rect(0, 0, card_w, 6, fill=1, stroke=0)
+    c.setFillColor(black)
+    size, lines = label
+    c.setFont(KOREAN_FONT, size)
+    for line, baseline in zip(lines, label_baselines(face_h / 2 + 4, size, len(lines))):
+        c.drawCentredString(card_w / 2, baseline, line)
+    c.setFont(KOREAN_FONT, 9)
+    c.setFillColor(CARD_CAPTION_COLOR)
+    c.drawString(10, face_h - 16, title)
+    c.drawRightString(card_w - 10, face_h - 16, seat)
+
+
+def draw_namecards(c, classes):
+    card_w, card_h = _card_size()
+    face_h = card_h / 2
+    per_page = CARD_COLS * CARD_ROWS
+    width, height = CARD_PAGE_SIZE
+    colors = {}
+    _card_template(c)
+
+    for title, entries in classes:
+        # 반마다 새 쪽에서 시작 (자르기 쉽게)
+        for start in range(0, len(entries), per_page):
+            for i, (seat, name, color) in enumerate(entries[start:start + per_page]):
+                if color not in colors:
+                    colors[color] = HexColor(color)
+                label = fit_label(name, KOREAN_FONT, card_w - 24, face_h - 40, max_size=40, min_size=12)
+
+                row, col = divmod(i, CARD_COLS)
+                c.saveState()
+                c.translate(CARD_MARGIN + col * card_w, height - CARD_MARGIN - (row + 1) * card_h)
+                c.doForm("namecard")
+                # 아래 절반은 학생 쪽, 위 절반은 뒤집어서 교사 쪽
+                _draw_card_face(c, card_w, face_h, title, seat, label, colors[color])
+                c.transform(-1, 0, 0, -1, card_w, card_h)  # 180도 회전
+                _draw_card_face(c, card_w, face_h, title, seat, label, colors[color])
+                c.restoreState()
+            c.showPage()
+
+
+def _attendance_template(c):
+    # 출석부 한 쪽의 빈 표 (머리글 + 줄)
+    width, height = CARD_PAGE_SIZE
+    row_h = (height - 120) / (ATTENDANCE_ROWS + 1)
+    left, right = 36, width - 36
+    top = height - 72
+
+    c.beginForm("attendance", lowerx=0, lowery=0, upperx=width, uppery=height)
+    c.setStrokeColor(HexColor("#9ca3af"))
+    c.setLineWidth(0.5)
+    c.setFillColor(HexColor("#eff6ff"))
+    c.rect(left, top - row_h, right - left, row_h, fill=1, stroke=0)
+    for r in range(ATTENDANCE_ROWS + 2):
+        c.line(left, top - r * row_h, right, top - r * row_h)
+
+    c.setFillColor(black)
+    c.setFont(KOREAN_FONT, 10)
+    x = left
+    for label, col_w in ATTENDANCE_COLS:
+        col_w = col_w or right - x
+        c.line(x, top, x, top - (ATTENDANCE_ROWS + 1) * row_h)
+        c.drawCentredString(x + col_w / 2, top - row_h + row_h * 0.3, label)
+        x += col_w
+    c.line(right, top, right, top - (ATTENDANCE_ROWS + 1) * row_h)
+    c.endForm()
+    return left, top, row_h
+
+
+def draw_attendance(c, classes):
+    width, height = CARD_PAGE_SIZE
+    left, top, row_h = _attendance_template(c)
+    seat_w, name_w = ATTENDANCE_COLS[0][1], ATTENDANCE_COLS[1][1]
+
+    for title, entries in classes:
+        pages = max(1, -(-len(entries) // ATTENDANCE_ROWS))
+        for page in range(pages):
+            c.doForm("attendance")
+            c.setFillColor(black)
+            c.setFont(KOREAN_FONT, 16)
+            c.drawString(left, height - 50, f"{title} 출석부 (자리 순)")
+            c.setFont(KOREAN_FONT, 9)
+            c.drawRightString(width - 36, height - 50, f"{page + 1} / {pages}")
+
+            c.setFont(KOREAN_FONT, 10)
+            rows = entries[page * ATTENDANCE_ROWS:(page + 1) * ATTENDANCE_ROWS]
+            for r, (seat, name, _) in enumerate(rows):
+                baseline = top - (r + 2) * row_h + row_h * 0.3
+                c.drawCentredString(left + seat_w / 2, baseline, seat)
+                c.drawString(left + seat_w + 6, baseline, name)
+            c.showPage()
+
+
+HANDOUT_KINDS = {
+    "cards": draw_namecards,
+    "attendance": draw_attendance,
+}
+
+
+def write_handouts(path, kind, classes):
+    # write_pdf와 같은 방식 (임시 파일에 다 쓴 뒤 바꿔치기)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+    try:
+        c = canvas.Canvas(tmp_path, pagesize=CARD_PAGE_SIZE)
+        HANDOUT_KINDS[kind](c, classes)
+        c.save()
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+def handout_bytes(share_code, kind, title, entries):
+    # 같은 배치 · 같은 제목이면 저장소 → 파일 → 새로 그리기 순으로 찾는다 (큰 것은 파일만)
+    key = f"{share_code}_{kind}_{hashlib.sha1(title.encode('utf-8')).hexdigest()[:8]}_v{PDF_LAYOUT_VERSION}"
+
+    def build():
+        path = os.path.join(PDF_DIR, f"{key}.pdf")
+        with perf_stage("handout", kind=kind, cards=len(entries)) as m:
+            m["cache_hit"] = os.path.exists(path)
+            if not m["cache_hit"]:
+                write_handouts(path, kind, [(title, entries)])
+                _prune_pdf_dir()
+        with open(path, "rb") as f:
+            return f.read()
+
+    data, _ = store_cached("pdf", key, build, keep=small_pdf)
+    return data
+
+
 # =========================================================
 # 8. Streamlit UI
 # =========================================================
 st.markdown(HTML_STYLE, unsafe_allow_html=True)
 st.title("🧑‍🏫 자리 랜덤 배치표 (Google Sheets 연동)")
 
+ROSTER_REPORT = ROSTER.get("report")
+if ROSTER_REPORT is not None and len(ROSTER_REPORT):
+    dropped = int((ROSTER_REPORT["처리"] == "뺌").sum())
+    st.warning(
+        f"⚠️ 명단에서 확인할 곳 {len(ROSTER_REPORT)}건 (뺀 줄 {dropped}개). "
+        "아래 '불러온 학생 명단 확인' → 문제 목록을 보세요."
+    )
+
 with st.expander("불러온 학생 명단 확인"):
-    st.dataframe(STUDENTS_DF)
+    tab_clean, tab_report, tab_raw = st.tabs(["정리된 명단", "문제 목록", "원본"])
+    with tab_clean:
+        st.dataframe(STUDENTS_DF)
+    with tab_report:
+        if ROSTER_REPORT is not None and len(ROSTER_REPORT):
+            st.caption("행: 시트 · 파일에서의 줄 번호")
+            st.dataframe(ROSTER_REPORT, hide_index=True)
+        else:
+            st.caption("문제 없음")
+    with tab_raw:
+        st.dataframe(ROSTER.get("raw", STUDENTS_DF))
+
+SEAT_SHAPES = {"Single": "혼자 앉기", "Paired": "짝으로 앉기", "Group": "모둠으로 앉기"}
 
 col1, col2 = st.columns(2)
 with col1:
-    seating_mode = st.radio(
-        "좌석 형태 선택",
-        ["Single", "Paired"],
-        format_func=lambda x: "혼자 앉기" if x == "Single" else "짝으로 앉기",
-    )
+    seat_shape = st.radio("좌석 형태 선택", list(SEAT_SHAPES), format_func=SEAT_SHAPES.get)
+    seating_mode = seat_shape
+    if seat_shape == "Group":
+        team_size = st.number_input(
+            "모둠 인원",
+            min_value=GROUP_SIZES[0],
+            max_value=GROUP_SIZES[-1],
+            value=4,
+            help="모둠마다 성별이 고르게, 수준(시트에 '수준' 열이 있으면)이 섞이도록 나눕니다.",
+        )
+        seating_mode = f"Group{int(team_size)}"
 with col2:
-    bun_dan = st.number_input("분단 수", min_value=2, max_value=10, value=5 if seating_mode == "Paired" else 4)
-    rows = st.number_input("줄 수(행)", min_value=2, max_value=10, value=6)
+    if is_group_mode(seating_mode):
+        bun_dan = st.number_input("한 줄 모둠 수", min_value=LAYOUT_MIN, max_value=LAYOUT_MAX, value=3)
+        rows = st.number_input("모둠 줄 수", min_value=LAYOUT_MIN, max_value=LAYOUT_MAX, value=2)
+    else:
+        bun_dan = st.number_input("분단 수", min_value=LAYOUT_MIN, max_value=LAYOUT_MAX, value=5 if seating_mode == "Paired" else 4)
+        rows = st.number_input("줄 수(행)", min_value=LAYOUT_MIN, max_value=LAYOUT_MAX, value=6)
+    seed = st.number_input(
+        "고정 시드 (선택)",
+        min_value=0,
+        value=None,
+        step=1,
+        placeholder="비워 두면 매번 새로 섞기",
+        help="같은 시드로 만들면 같은 명단·설정에서 항상 같은 배치가 나옵니다.",
+    )
+    fair = st.checkbox(
+        "앞뒤 줄 · 구역 고르게",
+        help="저장한 배치에서 뒤쪽(또는 한쪽)에 많이 앉았던 학생을 앞쪽(반대쪽)에 먼저 앉힙니다. "
+        "모둠으로 앉기에서는 뒤쪽에 많이 앉았던 모둠을 앞줄에 둡니다.",
+    )
 
+perf_inputs(
+    rows=int(rows),
+    bun_dan=int(bun_dan),
+    seating_mode=seating_mode,
+    seed=int(seed) if seed is not None else None,
+    fair=fair,
+)
+
+
+ROSTER_SIG = ROSTER["sig"]
+if st.session_state.get("history", {}).get("roster") != ROSTER_SIG:
+    if st.session_state.get("history", {}).get("versions"):
+        st.info("학생 명단이 바뀌어 이전 배치 기록을 초기화했습니다.")
+    st.session_state["history"] = new_history(ROSTER_SIG, len(STUDENTS_LIST))
+history = st.session_state["history"]
 
-if st.button("🎉 좌석 배치 생성", type="primary"):
-    if seating_mode == "Paired":
-        seats_per_row = int(bun_dan) * 2
-    else:
-        seats_per_row = int(bun_dan)
 
-    total_seats = int(rows) * seats_per_row
+def open_share_code(code):
+    order, layout, _, _ = decode_share_code(code, ROSTER_SIG, len(STUDENTS_LIST))
+    history_push(history, order, layout)
+
+
+# ?seat=<코드> 로 열면 최적화/섞기 없이 그 배치를 그대로 복원
+url_code = st.query_params.get("seat")
+if url_code and url_code != st.session_state.get("opened_code"):
+    st.session_state["opened_code"] = url_code
+    try:
+        open_share_code(url_code)
+    except ValueError as e:
+        st.error(f"❌ {e}")
+
+
+def saved_key(roster_sig, save_id):
+    # 저장마다 새 키 (같은 이름으로 여러 선생님이 저장해도 덮어쓰지 않는다). 이름은 값에 둔다
+    return f"saved:{roster_sig}:{save_id}"
+
+
+def unique_save_name(history, name, vid=None):
+    # 이미 다른 배치가 쓰는 이름이면 "이름 (2)", "이름 (3)" …
+    candidate, n = name, 1
+    while history["saved"].get(candidate, vid) != vid:
+        n += 1
+        candidate = f"{name} ({n})"
+    return candidate
+
+
+def sync_saved(history):
+    # 다른 세션 · 워커가 (같은 명단으로) 저장한 배치를 기록에 더한다.
+    # 반환: 새로 더한 (이름, 버전 번호) 목록, 저장한 순서
+    prefix = saved_key(ROSTER_SIG, "")
+    items = []
+    for key in state_scan(prefix):
+        if key in history["synced"]:
+            continue
+        history["synced"].add(key)
+        raw = state_get(key)
+        if not raw:
+            continue
+        try:
+            item = json.loads(raw)
+            # 예전 형식은 키 끝이 이름이었다
+            name = str(item.get("name") or key[len(prefix):])
+            items.append(({"code": str(item["code"]), "saved_at": float(item["saved_at"])}, name))
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            state_log.warning("skipping unreadable saved arrangement %s: %s", key, e)
+    items.sort(key=lambda item: item[0]["saved_at"])
+
+    added = []
+    for item, name in items:
+        try:
+            order, layout, _, _ = decode_share_code(item["code"], ROSTER_SIG, len(STUDENTS_LIST))
+        except ValueError:
+            continue
+        vid = history_add(history, order, layout)
+        name = unique_save_name(history, name, vid)
+        history["saved"][name] = vid
+        history["uploaded"].add(vid)  # 저장한 세션이 이미 시트에 올렸을 수 있다
+        fairness_add(history["fairness"], vid, order, layout, item["code"])
+        added.append((name, vid))
+    return added
+
+
+added = sync_saved(history)
+if added and history_current(history) is None:
+    # 새로 연 화면이면 가장 최근에 저장한 배치를 보여 준다
+    history_checkout(history, added[-1][1])
+    st.info(f"저장된 배치 {len(added)}개를 불러왔습니다. 지금 보이는 배치: {added[-1][0]}")
+
+
+if st.button("🎉 좌석 배치 생성", type="primary"):
+    total_seats = int(rows) * seats_per_row(int(bun_dan), seating_mode)
     num_students = len(STUDENTS_LIST)
 
     if total_seats < num_students:
         st.error("⚠️ 좌석이 부족해요!")
         st.warning(f"학생 {num_students}명 / 자리 {total_seats}석")
     else:
-        matrix = assign_seats(STUDENTS_LIST, int(rows), int(bun_dan), seating_mode)
-        st.session_state["matrix"] = matrix
-        st.session_state["bun_dan"] = int(bun_dan)
-        st.session_state["mode"] = seating_mode
+        with perf_stage("assign_seats", students=num_students, mode=seating_mode, fair=fair):
+            if is_group_mode(seating_mode):
+                order = assign_order_groups(
+                    STUDENTS_LIST,
+                    int(rows),
+                    int(bun_dan),
+                    seating_mode,
+                    seed=int(seed) if seed is not None else None,
+                    stats=history["fairness"] if fair else None,
+                )
+            elif fair:
+                order = assign_order_fair(
+                    history["fairness"],
+                    num_students,
+                    int(rows),
+                    int(bun_dan),
+                    seating_mode,
+                    seed=int(seed) if seed is not None else None,
+                )
+            else:
+                order = assign_order(
+                    num_students,
+                    int(rows),
+                    int(bun_dan),
+                    seating_mode,
+                    seed=int(seed) if seed is not None else None,
+                )
+        history_push(history, order, (int(rows), int(bun_dan), seating_mode))
         st.success("좌석 배치가 성공적으로 생성되었습니다!")
 
 
-if "matrix" in st.session_state:
-    matrix = st.session_state["matrix"]
-    bun_dan = st.session_state["bun_dan"]
-    seating_mode = st.session_state["mode"]
+def version_label(vid):
+    names = [name for name, v in history["saved"].items() if v == vid]
+    label = f"#{vid + 1}"
+    if names:
+        label += " · " + ", ".join(names)
+    if vid == history_current(history):
+        label += " (현재)"
+    return label
+
+
+def on_swap():
+    seat_a = st.session_state["swap_a"]
+    seat_b = st.session_state["swap_b"]
+    if seat_a != seat_b:
+        history_swap(history, seat_a, seat_b)
+
+
+def on_save():
+    name = st.session_state["save_name"].strip()
+    if name:
+        vid = history_current(history)
+        name = unique_save_name(history, name, vid)
+        history["saved"][name] = vid
+        st.session_state["save_name"] = ""
+
+        order = history_order(history, vid)
+        layout = history_layout(history, vid)
+        code = encode_share_code(order, layout, ROSTER_SIG, len(STUDENTS_LIST))
+        fairness_add(history["fairness"], vid, order, layout, code)
+        key = saved_key(ROSTER_SIG, uuid.uuid4().hex)
+        history["synced"].add(key)
+        state_set(
+            key,
+            json.dumps({"name": name, "code": code, "saved_at": time.time()}, ensure_ascii=False).encode("utf-8"),
+        )
+
+        if st.session_state.get("writeback"):
+            # 아직 안 올린 버전 전부 + 방금 이름 붙인 버전을 한 번에
+            vids = [v for v in range(len(history["versions"])) if v not in history["uploaded"]]
+            if vid not in vids:
+                vids.append(vid)
+            try:
+                n = write_arrangements(history, STUDENTS_LIST, vids)
+                st.session_state["writeback_result"] = ("success", f"시트('{ARRANGEMENT_SHEET}')에 배치 {n}개를 기록했습니다.")
+            except Exception as e:
+                st.session_state["writeback_result"] = ("error", f"❌ 시트 기록 실패: {e}")
+
+
+def on_open_code():
+    code = st.session_state["open_code"].strip()
+    if code:
+        try:
+            open_share_code(code)
+            st.session_state["open_code"] = ""
+        except ValueError as e:
+            st.session_state["open_code_error"] = str(e)
+
+
+def on_load():
+    vid = st.session_state["load_vid"]
+    if vid is not None and vid != history_current(history):
+        history_checkout(history, vid)
+
+
+current_vid = history_current(history)
+if current_vid is not None:
+    order = history_order(history, current_vid)
+    layout = history_layout(history, current_vid)
+    rows, bun_dan, seating_mode = layout
+    perf_inputs(shown_layout=list(layout), version=current_vid)
+    with perf_stage("build_matrix"):
+        matrix = build_matrix(STUDENTS_LIST, order, rows, bun_dan, seating_mode)
+    share_code = encode_share_code(order, layout, ROSTER_SIG, len(STUDENTS_LIST))
+    st.query_params["seat"] = share_code
+    st.session_state["opened_code"] = share_code
+
+    st.markdown("---")
+    h1, h2, h3 = st.columns([1, 1, 3])
+    with h1:
+        st.button(
+            "↩️ 실행 취소",
+            on_click=history_undo,
+            args=(history,),
+            disabled=history["cursor"] <= 0,
+        )
+    with h2:
+        st.button(
+            "↪️ 다시 실행",
+            on_click=history_redo,
+            args=(history,),
+            disabled=history["cursor"] >= len(history["timeline"]) - 1,
+        )
+    with h3:
+        st.caption(f"현재 배치: {version_label(current_vid)} / 전체 {len(history['versions'])}개 버전")
+
+    with st.expander("✏️ 자리 바꾸기 · 배치 저장/비교"):
+        def seat_option(seat):
+            idx = order[seat]
+            who = student_to_seat(STUDENTS_LIST[idx])["name"] if idx != EMPTY_SEAT else "빈 자리"
+            return f"{seat_position_label(seat, layout)} · {who}"
+
+        s1, s2 = st.columns(2)
+        with s1:
+            st.selectbox("바꿀 자리 1", range(len(order)), format_func=seat_option, key="swap_a")
+        with s2:
+            st.selectbox("바꿀 자리 2", range(len(order)), format_func=seat_option, key="swap_b")
+        st.button("🔁 두 자리 바꾸기", on_click=on_swap)
+
+        st.markdown("**배치 저장 / 불러오기**")
+        v1, v2 = st.columns(2)
+        with v1:
+            st.text_input("저장 이름", key="save_name", placeholder="예: 3월 1주차")
+            st.toggle(
+                f"Google 시트('{ARRANGEMENT_SHEET}')에도 기록",
+                key="writeback",
+                help="저장할 때 아직 기록하지 않은 배치를 한 번에 시트에 남깁니다. 서비스 계정에 편집 권한이 필요합니다.",
+            )
+            st.button("💾 현재 배치 저장", on_click=on_save)
+            if "writeback_result" in st.session_state:
+                level, message = st.session_state.pop("writeback_result")
+                getattr(st, level)(message)
+        with v2:
+            saved_vids = list(dict.fromkeys(history["saved"].values()))
+            st.selectbox(
+                "저장된 배치",
+                saved_vids,
+                format_func=version_label,
+                key="load_vid",
+                index=None,
+                placeholder="저장된 배치 선택",
+            )
+            st.button("📂 불러오기", on_click=on_load, disabled=not saved_vids)
+
+        st.markdown("**배치 코드**")
+        st.caption("이 코드(또는 지금 주소)를 열면 같은 배치와 PDF가 그대로 복원됩니다.")
+        st.code(share_code, language=None)
+        st.text_input("배치 코드로 열기", key="open_code")
+        st.button("🔗 코드 열기", on_click=on_open_code)
+        if "open_code_error" in st.session_state:
+            st.error(f"❌ {st.session_state.pop('open_code_error')}")
+
+        if len(history["versions"]) > 1:
+            st.markdown("**배치 비교**")
+            all_vids = list(range(len(history["versions"])))
+            c1, c2 = st.columns(2)
+            with c1:
+                vid_a = st.selectbox("비교 기준", all_vids, format_func=version_label, index=max(0, current_vid - 1))
+            with c2:
+                vid_b = st.selectbox("비교 대상", all_vids, format_func=version_label, index=current_vid)
+
+            moved = diff_orders(
+                history_order(history, vid_a), history_layout(history, vid_a),
+                history_order(history, vid_b), history_layout(history, vid_b),
+            )
+            st.caption(f"자리가 바뀐 학생: {len(moved)}명")
+            if moved:
+                st.dataframe(
+                    pd.DataFrame(
+                        [
+                            {
+                                "학생": student_to_seat(STUDENTS_LIST[idx])["name"],
+                                "기준 자리": a,
+                                "대상 자리": b,
+                            }
+                            for idx, a, b in moved
+                        ]
+                    ),
+                    hide_index=True,
+                )
+
+    if is_group_mode(seating_mode):
+        with st.expander("👥 모둠 구성"):
+            st.dataframe(group_summary(STUDENTS_LIST, order, layout), hide_index=True)
+
+    stats = history["fairness"]
+    with st.expander(f"📊 자리 공정성 (저장한 배치 {stats['saves']}개 기준)"):
+        if not stats["saves"]:
+            st.caption("배치를 저장하면 학생별로 몇 번째 줄 · 어느 구역에 앉았는지 쌓입니다.")
+        else:
+            f1, f2 = st.columns(2)
+            with f1:
+                st.metric("공정성 점수 (저장한 배치)", fairness_score(stats))
+            with f2:
+                if current_vid not in stats["counted"]:
+                    st.metric(
+                        "현재 배치까지 포함하면",
+                        fairness_score(stats, order, layout),
+                        help="현재 배치를 저장하면 바뀔 점수입니다. 100에 가까울수록 모두 앞뒤로 고르게 앉았습니다.",
+                    )
+            labels = [student_to_seat(s)["name"] for s in STUDENTS_LIST]
+            with perf_stage("fairness_chart", saves=stats["saves"]):
+                st.image(fairness_chart(stats["key"], stats, labels))
+
+            zones = len(FAIR_ZONES)
+            st.dataframe(
+                pd.DataFrame(
+                    [
+                        {
+                            "학생": label,
+                            "저장 배치": stats["seated"][i],
+                            "평균 위치 (앞 0 ~ 뒤 100)": round(mean * 100) if mean is not None else None,
+                            "1줄": stats["rows"][i * FAIR_MAX_ROWS],
+                            **{
+                                zone: stats["zones"][i * zones + z]
+                                for z, zone in enumerate(FAIR_ZONES)
+                            },
+                        }
+                        for i, (label, mean) in enumerate(zip(labels, mean_depths(stats)))
+                    ]
+                ),
+                hide_index=True,
+            )
 
     st.markdown("---")
     st.header("1️⃣ 교사 시야 (교탁 입장 기준)")
-    st.markdown(
-        render_chart(matrix, "teacher", bun_dan, seating_mode),
-        unsafe_allow_html=True,
-    )
+    with perf_stage("render_chart", view="teacher") as m:
+        teacher_html, m["cache_hit"] = store_cached(
+            "html",
+            content_key(share_code, "teacher", KOREAN_FONT),
+            lambda: render_chart(matrix, "teacher", bun_dan, seating_mode),
+        )
+        m["bytes"] = len(teacher_html)
+    st.markdown(teacher_html, unsafe_allow_html=True)
     st.markdown(
         '<div style="text-align:center;"><span class="front-of-class">교탁</span></div>',
         unsafe_allow_html=True,
@@ -481,15 +2752,27 @@ if "matrix" in st.session_state:
         '<div style="text-align:center;"><span class="front-of-class">교탁</span></div>',
         unsafe_allow_html=True,
     )
-    st.markdown(
-        render_chart(matrix, "student", bun_dan, seating_mode),
-        unsafe_allow_html=True,
-    )
+    with perf_stage("render_chart", view="student") as m:
+        student_html, m["cache_hit"] = store_cached(
+            "html",
+            content_key(share_code, "student", KOREAN_FONT),
+            lambda: render_chart(matrix, "student", bun_dan, seating_mode),
+        )
+        m["bytes"] = len(student_html)
+    st.markdown(student_html, unsafe_allow_html=True)
 
     # PDF 다운로드
-    teacher_pdf = make_pdf(matrix, seating_mode, "teacher", bun_dan, "교사용 좌석 배치표")
-    student_pdf = make_pdf(matrix, seating_mode, "student", bun_dan, "학생용 좌석 배치표")
-    both_pdf = make_pdf_both(matrix, seating_mode, bun_dan)
+    # PDF는 버튼을 누를 때 만들고 (공용 저장소 → 파일 → 새로 그리기 순으로 찾는다.
+    # PDF_STORE_MAX_BYTES보다 큰 것은 저장소에 두지 않고 파일에서 읽어 보낸다)
+    # 다운로드는 실행이 끝난 뒤 따로 만들어지므로 느린 실행 기록도 따로 남긴다
+    download_inputs = {
+        "students": len(STUDENTS_LIST), "rows": rows, "bun_dan": bun_dan, "seating_mode": seating_mode,
+    }
+
+    def pdf_download(kind):
+        return lambda: profiled(
+            f"pdf_{kind}", lambda: pdf_bytes(share_code, kind, matrix, seating_mode, bun_dan), **download_inputs
+        )
 
     st.markdown("---")
     st.subheader("📄 PDF 다운로드")
@@ -498,25 +2781,79 @@ if "matrix" in st.session_state:
     with d1:
         st.download_button(
             "📥 교사용 PDF",
-            teacher_pdf,
+            pdf_download("teacher"),
             file_name="seating_teacher.pdf",
             mime="application/pdf",
         )
     with d2:
         st.download_button(
             "📥 학생용 PDF",
-            student_pdf,
+            pdf_download("student"),
             file_name="seating_student.pdf",
             mime="application/pdf",
         )
     with d3:
         st.download_button(
             "📥 교사+학생 한 번에",
-            both_pdf,
+            pdf_download("both"),
             file_name="seating_both.pdf",
             mime="application/pdf",
         )
 
+    st.subheader("🪪 책상 이름표 · 출석부")
+    entries = seat_entries(STUDENTS_LIST, order, layout)
+    n1, n2, n3 = st.columns(3)
+    with n1:
+        handout_title = st.text_input("반 이름", placeholder="예: 2학년 3반").strip() or "우리 반"
+    with n2:
+        st.download_button(
+            "📥 책상 이름표 (A4 한 장에 8개)",
+            lambda: profiled(
+                "handout_cards",
+                lambda: handout_bytes(share_code, "cards", handout_title, entries),
+                **download_inputs,
+            ),
+            file_name="name_cards.pdf",
+            mime="application/pdf",
+        )
+    with n3:
+        st.download_button(
+            "📥 자리 순 출석부",
+            lambda: profiled(
+                "handout_attendance",
+                lambda: handout_bytes(share_code, "attendance", handout_title, entries),
+                **download_inputs,
+            ),
+            file_name="attendance.pdf",
+            mime="application/pdf",
+        )
+
+    st.subheader("🖼️ 이미지 저장 (메신저 · 교실 TV)")
+    i1, i2, i3 = st.columns(3)
+    with i1:
+        image_view = st.radio(
+            "시야",
+            ["student", "teacher"],
+            format_func=lambda x: "학생용" if x == "student" else "교사용",
+            horizontal=True,
+        )
+    with i2:
+        image_format = st.selectbox("형식", list(IMAGE_FORMATS))
+    with i3:
+        fmt, dpi = IMAGE_FORMATS[image_format]
+        image_title = "학생용 좌석 배치표" if image_view == "student" else "교사용 좌석 배치표"
+        st.download_button(
+            "📥 이미지 받기",
+            lambda: profiled(
+                f"image_{fmt}",
+                lambda: chart_image(matrix, seating_mode, image_view, bun_dan, image_title, fmt, dpi),
+                dpi=dpi,
+                **download_inputs,
+            ),
+            file_name=f"seating_{image_view}.{fmt}",
+            mime="image/svg+xml" if fmt == "svg" else "image/png",
+        )
+
 # 범례
 st.markdown("---")
 st.subheader("🌈 성별 색상 안내")
@@ -538,3 +2875,28 @@ with cC:
     )
 
 st.caption("이름은 ‘번호 이름’ 형식으로 표시됩니다. (예: 3 김미연)")
+
+
+# =========================================================
+# 9. 성능 패널 (?debug=1)
+# =========================================================
+finish_perf_run()
+
+if st.query_params.get("debug") == "1":
+    with st.expander("⏱️ 성능 패널", expanded=True):
+        st.caption(f"이번 실행: {RUN_PERF['total_ms']} ms")
+        st.dataframe(pd.DataFrame(RUN_PERF["stages"]), hide_index=True)
+        st.caption("최근 실행 집계 (모든 세션)")
+        st.dataframe(pd.DataFrame(perf_summary()), hide_index=True)
+        store_rows, store_bytes = store_summary()
+        st.caption(
+            f"공용 저장소: {store_bytes / 1024 / 1024:.1f} / {STORE_MAX_BYTES / 1024 / 1024:.0f} MB"
+        )
+        st.dataframe(pd.DataFrame(store_rows), hide_index=True)
+        if PROFILE_MS > 0:
+            st.caption(f"느린 실행 기록 ({PROFILE_MS:g} ms 넘은 실행 · {PROFILE_DIR})")
+            if RUN_PERF.get("profile_path"):
+                st.caption(f"이번 실행 기록: {RUN_PERF['profile_path']}")
+            profiles = recent_profiles()
+            if profiles:
+                st.dataframe(pd.DataFrame(profiles), hide_index=True)
@@ -0,0 +1,273 @@
+"""자리 배치 · 렌더링 · PDF 벤치마크.
+
+가짜 명단(24~5,000명)으로 app.py의 함수들을 Single/Paired/모둠(Group5), 교사용/학생용으로
+돌려 시간(중앙값), 메모리 할당(tracemalloc 최고치), 결과 크기를 잰다.
+저장된 기준값(baseline.json)과 비교해 느려지거나 커진 항목, 기준값이 없는 항목이 있으면
+종료 코드 1.
+
+    python benchmarks/bench_seating.py                  # 실행 + 기준값 비교
+    python benchmarks/bench_seating.py --quick          # 24, 100명만
+    python benchmarks/bench_seating.py --save-baseline  # 이 컴퓨터 기준값 다시 저장
+"""
+import argparse
+import io
+import json
+import logging
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+import fake_gspread  # noqa: E402
+
+SIZES = [24, 100, 500, 2000, 5000]
+QUICK_SIZES = [24, 100]
+MODES = ["Single", "Paired", "Group5"]
+VIEWS = ["teacher", "student"]
+CLASS_SIZE = 30  # 학교 전체 묶음에서 한 페이지(한 반)에 들어가는 학생 수
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+
+
+def load_app(records):
+    # app.py를 bare 모드로 불러온다 (화면 없이 함수만 사용)
+    os.environ.setdefault("MYCLASS_PERF_LOG", "0")
+    # 가짜 명단이 실제 서버가 쓰는 기본 상태 저장소(SQLite)에 섞이지 않게 프로세스 안에만 둔다
+    os.environ["MYCLASS_STATE_URL"] = "memory://"
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    fake_gspread.install(fake_gspread.FakeBackend(records))
+    import app
+    return app
+
+
+def layout_for(n, mode):
+    # 10분단(모둠은 한 줄 10모둠) 기준으로 모두 앉을 만큼 줄 수를 늘린다
+    bun_dan = 4 if n <= 24 else 10
+    per_desk = int(mode[len("Group"):]) if mode.startswith("Group") else 2 if mode == "Paired" else 1
+    cols = bun_dan * per_desk
+    rows = max(2, math.ceil(n / cols))
+    return rows, bun_dan
+
+
+def measure(fn, min_time=0.2, min_runs=3, max_runs=50):
+    # 반환: (중앙값 ms, 최고 할당 KiB, 마지막 결과)
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    times = []
+    started = time.perf_counter()
+    while len(times) < min_runs or (time.perf_counter() - started < min_time and len(times) < max_runs):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return times[len(times) // 2], peak / 1024, result
+
+
+def output_size(result):
+    if isinstance(result, int):
+        return result
+    if isinstance(result, (bytes, str)):
+        return len(result)
+    if isinstance(result, tuple):  # (정리된 명단, 문제 목록)
+        return output_size(result[0])
+    if isinstance(result, dict) and "list" in result:  # 공용 저장소의 명단
+        return len(result["list"])
+    if hasattr(result, "shape"):
+        return int(result.shape[0])
+    if isinstance(result, list):
+        return sum(len(row) if isinstance(row, list) else 1 for row in result)
+    return None
+
+
+def run_cases(app, n):
+    students = fake_gspread.make_records(n, seed=n)
+    results = {}
+
+    def record(name, fn):
+        ms, peak_kb, result = measure(fn)
+        results[f"{name}@{n}"] = {
+            "ms": round(ms, 3),
+            "peak_kb": round(peak_kb, 1),
+            "bytes": output_size(result),
+        }
+
+    backend = fake_gspread.FakeBackend(students)
+    fake_gspread.install(backend)
+    # 받아 둔 명단을 버리고 이 크기의 가짜 시트로 한 번 받아 둔다 (화면 경로만 잰다)
+    app.warmup.reset()
+    app.warmup.refresh(app.SPREADSHEET_ID)
+    record("load_student_data", app.load_student_data)
+    for ext, data in roster_files(students).items():
+        record(f"read_roster[{ext}]", lambda: app.ROSTER_READERS[ext](data))
+    raw = app.pd.DataFrame(students)
+    record("clean_roster", lambda: app.clean_roster(raw))
+    record("student_to_seat", lambda: [app.student_to_seat(s) for s in students])
+
+    for mode in MODES:
+        rows, bun_dan = layout_for(n, mode)
+        record(f"assign_seats[{mode}]", lambda: app.assign_seats(students, rows, bun_dan, mode, seed=1))
+        matrix = app.assign_seats(students, rows, bun_dan, mode, seed=1)
+
+        for view in VIEWS:
+            record(f"render_chart[{mode},{view}]", lambda: app.render_chart(matrix, view, bun_dan, mode))
+            record(f"draw_pdf_page[{mode},{view}]", lambda: draw_only(app, matrix, mode, view, bun_dan))
+            record(f"make_pdf[{mode},{view}]", lambda: app.make_pdf(matrix, mode, view, bun_dan, "좌석 배치표"))
+        record(f"make_pdf_both[{mode}]", lambda: app.make_pdf_both(matrix, mode, bun_dan))
+
+    # 학교 전체 묶음: 반마다 한 쪽씩, 임시 파일로 바로 쓰기
+    path = os.path.join(app.PDF_DIR, f"bench_booklet_{n}.pdf")
+    record("write_pdf[booklet]", lambda: booklet(app, students, path))
+    for kind in app.HANDOUT_KINDS:
+        record(f"write_handouts[{kind}]", lambda: handouts(app, students, kind, path))
+    return results
+
+
+def roster_files(students):
+    # 같은 명단을 CSV(cp949 + 제목 줄) / 엑셀 / Parquet 파일 내용으로 만든다
+    import pandas as pd
+
+    df = pd.DataFrame(students)
+    xlsx, parquet = io.BytesIO(), io.BytesIO()
+    with pd.ExcelWriter(xlsx, engine="openpyxl") as w:
+        df.to_excel(w, index=False, startrow=1)
+    df.to_parquet(parquet)
+    return {
+        ".csv": ("명렬표,,\n" + df.to_csv(index=False)).encode("cp949"),
+        ".xlsx": xlsx.getvalue(),
+        ".parquet": parquet.getvalue(),
+    }
+
+
+def draw_only(app, matrix, mode, view, bun_dan):
+    c = app.canvas.Canvas(io.BytesIO(), pagesize=app.PAGE_SIZE)
+    app.draw_pdf_page(c, matrix, mode, view, bun_dan, "좌석 배치표")
+    return None
+
+
+def booklet(app, students, path):
+    rows, bun_dan = 6, 5
+    pages = (
+        (
+            app.assign_seats(students[i:i + CLASS_SIZE], rows, bun_dan, "Single", seed=i),
+            "Single",
+            "student",
+            bun_dan,
+            f"{i // CLASS_SIZE + 1}반 좌석 배치표",
+        )
+        for i in range(0, len(students), CLASS_SIZE)
+    )
+    app.write_pdf(path, pages)
+    size = os.path.getsize(path)
+    os.remove(path)
+    return size
+
+
+def handouts(app, students, kind, path):
+    # 학년 전체 이름표 / 출석부를 한 파일로
+    rows, bun_dan = 6, 5
+    layout = (rows, bun_dan, "Single")
+    classes = [
+        (
+            f"{i // CLASS_SIZE + 1}반",
+            app.seat_entries(
+                students[i:i + CLASS_SIZE],
+                app.assign_order(len(students[i:i + CLASS_SIZE]), rows, bun_dan, "Single", seed=i),
+                layout,
+            ),
+        )
+        for i in range(0, len(students), CLASS_SIZE)
+    ]
+    app.write_handouts(path, kind, classes)
+    size = os.path.getsize(path)
+    os.remove(path)
+    return size
+
+
+def compare(results, baseline, tolerance):
+    # 반환: (나빠진 항목, 기준값이 없는 항목). 기준값이 없으면 비교를 못 했으니 통과로 치지 않는다
+    regressions, missing = [], []
+    for key, cur in results.items():
+        base = baseline.get(key)
+        if not base:
+            missing.append(key)
+            continue
+        for metric in ("ms", "peak_kb"):
+            # 아주 짧은 측정값은 흔들림이 커서 비교하지 않는다
+            floor = 1.0 if metric == "ms" else 64.0
+            if base[metric] >= floor and cur[metric] > base[metric] * tolerance:
+                regressions.append((key, metric, base[metric], cur[metric]))
+        if base.get("bytes") and cur.get("bytes") and cur["bytes"] > base["bytes"] * tolerance:
+            regressions.append((key, "bytes", base["bytes"], cur["bytes"]))
+    return regressions, missing
+
+
+def print_table(results, baseline):
+    print(f"{'case':44} {'ms':>10} {'base ms':>10} {'peak KiB':>10} {'bytes':>10}")
+    for key, cur in results.items():
+        base = baseline.get(key, {})
+        base_ms = f"{base['ms']:.3f}" if "ms" in base else "-"
+        size = cur["bytes"] if cur["bytes"] is not None else "-"
+        print(f"{key:44} {cur['ms']:10.3f} {base_ms:>10} {cur['peak_kb']:10.1f} {size:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", help="학생 수 목록 (쉼표 구분)")
+    parser.add_argument("--quick", action="store_true", help="24, 100명만")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="기준값 대비 허용 배율")
+    parser.add_argument("--json", help="결과를 JSON으로 저장할 경로")
+    args = parser.parse_args(argv)
+
+    if args.sizes:
+        sizes = [int(x) for x in args.sizes.split(",")]
+    else:
+        sizes = QUICK_SIZES if args.quick else SIZES
+
+    app = load_app(fake_gspread.make_records(24))
+    results = {}
+    for n in sizes:
+        results.update(run_cases(app, n))
+    fake_gspread.uninstall()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print_table(results, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=1)
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=1, sort_keys=True)
+        print(f"\n기준값 저장: {args.baseline}")
+        return 0
+
+    regressions, missing = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n⚠️ 기준값보다 {args.tolerance}배 넘게 나빠진 항목:")
+        for key, metric, base, cur in regressions:
+            print(f"  {key} {metric}: {base} → {cur}")
+    if missing:
+        print(f"\n⚠️ 기준값이 없어 비교하지 못한 항목 ({len(missing)}개, --save-baseline으로 저장):")
+        for key in missing:
+            print(f"  {key}")
+    return 1 if regressions or missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
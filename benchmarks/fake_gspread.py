@@ -0,0 +1,137 @@
+"""로컬 가짜 Google Sheets (gspread) — 벤치마크/부하 테스트용.
+
+app.py가 쓰는 경로(Credentials → gspread.authorize → open_by_key → sheet1
+→ get_all_records, 배치 기록용 worksheet/add_worksheet → append_rows)를
+네트워크 없이 흉내 낸다. install()로 끼우고 uninstall()로 되돌린다.
+API 호출은 워크시트마다 calls에 남으니 호출 횟수를 확인할 수 있다.
+"""
+import random
+import threading
+import time
+
+import gspread
+import streamlit
+from google.oauth2.service_account import Credentials
+
+SURNAMES = "김이박최정강조윤장임한오서신권황안송류홍전고문양손배백허남심노하곽성차주우구민류나진지엄채원천방공현함변염여추도소석선설마길연위표명기반왕금옥육인맹제모탁국어은편용"
+GIVEN = "민서준지우예도윤하은현수연주아진영호성희경태혜원재유채승나다리람빈솔찬건훈"
+
+
+def make_records(n, seed=0, number_col="출석 번호", name_col="이름", gender_col="성별"):
+    rng = random.Random(seed)
+    genders = ["M", "F", "남", "여"]
+    return [
+        {
+            number_col: i + 1,
+            name_col: rng.choice(SURNAMES) + rng.choice(GIVEN) + rng.choice(GIVEN),
+            gender_col: rng.choice(genders),
+        }
+        for i in range(n)
+    ]
+
+
+class FakeWorksheet:
+    def __init__(self, title, records=None, latency=0.0):
+        self.title = title
+        self.records = list(records or [])
+        self.values = []  # append_rows로 쓴 줄 (헤더 포함, 원래 값 그대로)
+        self.latency = latency
+        self.calls = []
+
+    def _call(self, name):
+        self.calls.append(name)
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get_all_records(self):
+        self._call("get_all_records")
+        return [dict(r) for r in self.records]
+
+    def get_all_values(self):
+        self._call("get_all_values")
+        return [list(row) for row in self.values]
+
+    def append_rows(self, values, value_input_option="RAW", **kwargs):
+        self._call("append_rows")
+        self.values.extend(list(row) for row in values)
+        return {"updates": {"updatedRows": len(values)}}
+
+
+class FakeSpreadsheet:
+    def __init__(self, key, records=None, latency=0.0):
+        self.id = key
+        self.latency = latency
+        self._worksheets = [FakeWorksheet("Sheet1", records, latency)]
+
+    @property
+    def sheet1(self):
+        return self._worksheets[0]
+
+    def worksheets(self):
+        return list(self._worksheets)
+
+    def worksheet(self, title):
+        for ws in self._worksheets:
+            if ws.title == title:
+                return ws
+        raise gspread.exceptions.WorksheetNotFound(title)
+
+    def add_worksheet(self, title, rows=100, cols=26, index=None):
+        ws = FakeWorksheet(title, latency=self.latency)
+        self._worksheets.append(ws)
+        return ws
+
+
+class FakeClient:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def open_by_key(self, key):
+        return self.backend.spreadsheet(key)
+
+
+class FakeBackend:
+    """스프레드시트 ID별 가짜 시트 묶음. 모든 세션/스레드가 같이 쓴다."""
+
+    def __init__(self, records=None, latency=0.0):
+        self.default_records = records if records is not None else make_records(24)
+        self.latency = latency
+        self.spreadsheets = {}
+        self.authorize_calls = 0
+        self._lock = threading.Lock()
+
+    def spreadsheet(self, key):
+        with self._lock:
+            if key not in self.spreadsheets:
+                self.spreadsheets[key] = FakeSpreadsheet(key, self.default_records, self.latency)
+            return self.spreadsheets[key]
+
+    def authorize(self, creds):
+        with self._lock:
+            self.authorize_calls += 1
+        return FakeClient(self)
+
+
+_saved = {}
+
+
+def install(backend):
+    """gspread.authorize / Credentials / st.secrets 를 가짜로 바꾼다."""
+    if _saved:
+        uninstall()
+    _saved["authorize"] = gspread.authorize
+    _saved["from_info"] = Credentials.__dict__["from_service_account_info"]
+    _saved["secrets"] = streamlit.secrets
+
+    gspread.authorize = backend.authorize
+    Credentials.from_service_account_info = classmethod(lambda cls, info, scopes=None: ("fake-creds", tuple(scopes or ())))
+    streamlit.secrets = {"gcp_service_account": {"type": "service_account", "client_email": "bench@example.com"}}
+    return backend
+
+
+def uninstall():
+    if not _saved:
+        return
+    gspread.authorize = _saved.pop("authorize")
+    Credentials.from_service_account_info = _saved.pop("from_info")
+    streamlit.secrets = _saved.pop("secrets")
@@ -0,0 +1,337 @@
+"""동시 접속 부하 테스트.
+
+여러 선생님이 동시에 앱을 쓰는 상황을 흉내 낸다. 실제 `streamlit run` 서버를 띄우고
+(Google Sheets 대신 benchmarks/fake_gspread.py 의 가짜 시트 사용) 브라우저처럼
+웹소켓으로 세션을 여러 개 열어 명단 불러오기 → 분단 수 바꾸기 → 배치 생성 →
+PDF 3종 다운로드를 진행한다. 처리량, 단계별 지연(p50/p95/p99), 서버의 세션당 메모리를 보고한다.
+
+    python benchmarks/load_test.py --sessions 40 --concurrency 8
+    python benchmarks/load_test.py --sessions 100 --concurrency 20 --sheet-latency 0.3
+    python benchmarks/load_test.py --url http://학교서버:8501 --sessions 20   # 이미 떠 있는 서버
+
+웹소켓 클라이언트로 websockets 패키지(Streamlit 설치 시 함께 설치됨)를 쓴다.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+APP_PATH = os.path.join(ROOT, "app.py")
+
+STEPS = ["load", "set_bun_dan", "generate", "download_pdf"]
+
+
+# ---------------------------------------------------------
+# 서버 (가짜 시트를 끼운 streamlit)
+# ---------------------------------------------------------
+def serve(port, students, latency):
+    sys.path.insert(0, HERE)
+    import fake_gspread
+    from streamlit import config
+    from streamlit.web import bootstrap
+
+    fake_gspread.install(fake_gspread.FakeBackend(fake_gspread.make_records(students), latency=latency))
+    flags = {
+        "server.port": port,
+        "server.headless": True,
+        "server.enableXsrfProtection": False,
+        "server.fileWatcherType": "none",
+        "browser.gatherUsageStats": False,
+    }
+    for key, value in flags.items():
+        config.set_option(key, value, where_defined="load_test")
+    bootstrap.run(APP_PATH, False, [], flags)
+
+
+def start_server(args, state_url):
+    cmd = [
+        sys.executable, os.path.abspath(__file__), "--serve",
+        "--port", str(args.port),
+        "--students", str(args.students),
+        "--sheet-latency", str(args.sheet_latency),
+    ]
+    env = dict(os.environ, MYCLASS_PERF_LOG=os.environ.get("MYCLASS_PERF_LOG", "0"), MYCLASS_STATE_URL=state_url)
+    log = open(args.server_log, "w") if args.server_log else subprocess.DEVNULL
+    proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT, env=env)
+
+    url = f"http://127.0.0.1:{args.port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("서버가 시작되지 못했습니다. --server-log 로 로그를 확인하세요.")
+        try:
+            with urllib.request.urlopen(url + "/_stcore/health", timeout=2) as r:
+                if r.read().strip() == b"ok":
+                    return proc, url
+        except OSError:
+            time.sleep(0.3)
+    proc.kill()
+    raise RuntimeError("서버 응답 대기 시간 초과")
+
+
+def rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+# ---------------------------------------------------------
+# 가상 브라우저 세션
+# ---------------------------------------------------------
+class Session:
+    def __init__(self, base_url, ws):
+        self.base_url = base_url
+        self.ws = ws
+        self.session_id = ""
+        self.widgets = {}   # 라벨 → 위젯 proto
+        self.states = {}    # 위젯 id → WidgetState (브라우저처럼 매번 전부 보낸다)
+        self.request_ids = itertools.count()
+
+    async def rerun(self, trigger_id=None):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        for state in self.states.values():
+            msg.rerun_script.widget_states.widgets.append(state)
+        if trigger_id:
+            trigger = msg.rerun_script.widget_states.widgets.add()
+            trigger.id = trigger_id
+            trigger.trigger_value = True
+        await self.ws.send(msg.SerializeToString())
+
+        errors = []
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await self.ws.recv())
+            kind = fwd.WhichOneof("type")
+            if kind == "new_session":
+                self.session_id = fwd.new_session.initialize.session_id
+            elif kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                element = fwd.delta.new_element
+                element_type = element.WhichOneof("type")
+                if element_type == "exception":
+                    errors.append(element.exception.message)
+                elif element_type in ("button", "number_input", "download_button"):
+                    widget = getattr(element, element_type)
+                    self.widgets[widget.label] = widget
+            elif kind == "script_finished":
+                if fwd.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue
+                if errors:
+                    raise RuntimeError(errors[0])
+                return
+
+    def set_int(self, label, value):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        state = WidgetState()
+        state.id = self.widgets[label].id
+        state.int_value = value
+        self.states[state.id] = state
+
+    async def download(self, label):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        request_id = f"load-{next(self.request_ids)}"
+        msg = BackMsg()
+        msg.backend_operation_request.request_id = request_id
+        msg.backend_operation_request.session_id = self.session_id
+        msg.backend_operation_request.deferred_file.file_id = self.widgets[label].deferred_file_id
+        await self.ws.send(msg.SerializeToString())
+
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await self.ws.recv())
+            if fwd.WhichOneof("type") != "backend_operation_response":
+                continue
+            response = fwd.backend_operation_response
+            if response.request_id != request_id:
+                continue
+            if response.error_msg:
+                raise RuntimeError(response.error_msg)
+            url = self.base_url + response.deferred_file.url
+            return await asyncio.to_thread(lambda: urllib.request.urlopen(url, timeout=120).read())
+
+
+async def run_session(index, base_url, students, timings, limit, stepped, hold):
+    import websockets
+
+    rng = random.Random(index)
+    # 기본 6줄 · 혼자 앉기에서 모두 앉을 수 있는 분단 수 중 하나
+    min_bun_dan = min(10, max(2, math.ceil(students / 6)))
+    ws_url = base_url.replace("http", "ws", 1) + "/_stcore/stream"
+    async with websockets.connect(ws_url, max_size=None) as ws:
+        session = Session(base_url, ws)
+
+        async def step(name, coro):
+            t0 = time.perf_counter()
+            result = await coro
+            timings[name].append((time.perf_counter() - t0) * 1000)
+            return result
+
+        size = 0
+        try:
+            async with limit:
+                await step("load", session.rerun())
+
+                session.set_int("분단 수", rng.randint(min_bun_dan, min(10, min_bun_dan + 3)))
+                await step("set_bun_dan", session.rerun())
+
+                await step("generate", session.rerun(trigger_id=session.widgets["🎉 좌석 배치 생성"].id))
+
+                for label in ("📥 교사용 PDF", "📥 학생용 PDF", "📥 교사+학생 한 번에"):
+                    size += len(await step("download_pdf", session.download(label)))
+        finally:
+            stepped()
+
+        # 서버 메모리를 잴 때까지 세션(웹소켓)을 열어 둔다
+        await hold.wait()
+        return size
+
+
+async def drive(args, base_url, server_pid):
+    released = asyncio.Event()
+    released.set()
+
+    # 첫 세션으로 import · 폰트 등 초기 비용을 빼고 잰다
+    await run_session(-1, base_url, args.students, defaultdict(list), asyncio.Semaphore(1), lambda: None, released)
+    rss_before = rss_kb(server_pid) if server_pid else None
+
+    timings = defaultdict(list)
+    limit = asyncio.Semaphore(args.concurrency)
+    hold = asyncio.Event()
+    all_stepped = asyncio.Event()
+    remaining = args.sessions
+
+    def stepped():
+        nonlocal remaining
+        remaining -= 1
+        if remaining == 0:
+            all_stepped.set()
+
+    started = time.perf_counter()
+    tasks = [
+        asyncio.ensure_future(run_session(i, base_url, args.students, timings, limit, stepped, hold))
+        for i in range(args.sessions)
+    ]
+    await all_stepped.wait()
+    elapsed = time.perf_counter() - started
+    rss_after = rss_kb(server_pid) if server_pid else None
+    hold.set()
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    errors = [f"session {i}: {r}" for i, r in enumerate(results) if isinstance(r, BaseException)]
+    sizes = [r for r in results if not isinstance(r, BaseException)]
+    return timings, errors, sizes, elapsed, rss_before, rss_after
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=40, help="전체 세션 수")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시에 진행하는 세션 수")
+    parser.add_argument("--students", type=int, default=28, help="가짜 명단 학생 수")
+    parser.add_argument("--sheet-latency", type=float, default=0.05, help="가짜 시트 응답 지연 (초)")
+    parser.add_argument("--port", type=int, default=8599)
+    parser.add_argument("--url", help="이미 떠 있는 서버 주소 (없으면 가짜 시트로 직접 띄움)")
+    parser.add_argument("--server-pid", type=int, help="--url 서버의 PID (메모리 측정용)")
+    parser.add_argument("--server-log", help="직접 띄운 서버의 로그 파일")
+    parser.add_argument("--json", help="결과를 JSON으로 저장할 경로")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.port, args.students, args.sheet_latency)
+        return 0
+
+    proc = state_dir = None
+    if args.url:
+        base_url, server_pid = args.url.rstrip("/"), args.server_pid
+    else:
+        # 직접 띄우는 서버는 이번 실행만의 상태 저장소를 쓴다
+        # (기본 저장소를 쓰면 실제 서버나 벤치마크가 남긴 명단을 읽어 온다)
+        state_dir = tempfile.mkdtemp(prefix="myclass_load_test_")
+        proc, base_url = start_server(args, "sqlite:///" + os.path.join(state_dir, "state.sqlite3"))
+        server_pid = proc.pid
+
+    try:
+        timings, errors, sizes, elapsed, rss_before, rss_after = asyncio.run(drive(args, base_url, server_pid))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+        if state_dir is not None:
+            shutil.rmtree(state_dir, ignore_errors=True)
+
+    done = len(sizes)
+    reruns = sum(len(timings[s]) for s in ("load", "set_bun_dan", "generate"))
+    per_session_kb = None
+    if rss_before is not None and rss_after is not None:
+        per_session_kb = round((rss_after - rss_before) / max(args.sessions, 1), 1)
+
+    report = {
+        "sessions": args.sessions,
+        "completed": done,
+        "errors": len(errors),
+        "concurrency": args.concurrency,
+        "elapsed_s": round(elapsed, 2),
+        "sessions_per_s": round(done / elapsed, 2) if elapsed else 0,
+        "reruns_per_s": round(reruns / elapsed, 2) if elapsed else 0,
+        "pdf_bytes": sum(sizes),
+        "server_rss_kb": {"before": rss_before, "after": rss_after},
+        "server_kb_per_session": per_session_kb,
+        "latency_ms": {
+            step: {
+                "p50": round(percentile(timings[step], 50), 1),
+                "p95": round(percentile(timings[step], 95), 1),
+                "p99": round(percentile(timings[step], 99), 1),
+                "max": round(max(timings[step]), 1) if timings[step] else 0.0,
+            }
+            for step in STEPS
+        },
+    }
+
+    print(f"세션 {done}/{args.sessions} 완료 · 동시 {args.concurrency} · {report['elapsed_s']}s")
+    print(f"처리량: {report['sessions_per_s']} 세션/s, {report['reruns_per_s']} rerun/s")
+    if per_session_kb is not None:
+        print(f"서버 메모리: {rss_before} → {rss_after} KiB (세션당 {per_session_kb} KiB)")
+    print(f"{'단계':14} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  (ms)")
+    for step, lat in report["latency_ms"].items():
+        print(f"{step:14} {lat['p50']:9.1f} {lat['p95']:9.1f} {lat['p99']:9.1f} {lat['max']:9.1f}")
+    for line in errors[:10]:
+        print("❌", line)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""미리 데운 뒤 streamlit 서버를 켠다.
+
+    python serve.py                       # = streamlit run app.py
+    python serve.py --server.port 8080    # streamlit 옵션은 그대로 넘긴다
+
+서버가 뜨는 동안 백그라운드 스레드(warmup.py)가 무거운 모듈 import, 글꼴 등록,
+Sheets 인증, 명단 받기를 끝내 두므로 재시작 후 첫 선생님도 바로 화면을 본다.
+받을 스프레드시트는 app.py의 SPREADSHEET_ID (+ MYCLASS_PREFETCH_SHEETS).
+"""
+import ast
+import os
+import sys
+
+import warmup
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(HERE, "app.py")
+FONT_PATH = os.path.join(HERE, "fonts", "MaruBuri-Regular.ttf")
+
+
+def app_constant(name, path=APP_PATH):
+    # app.py를 실행하지 않고 맨 위 상수 값만 읽는다
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == name for t in node.targets):
+            return ast.literal_eval(node.value)
+    return None
+
+
+def main():
+    keys = [app_constant("SPREADSHEET_ID")]
+    keys += [k.strip() for k in os.environ.get("MYCLASS_PREFETCH_SHEETS", "").split(",") if k.strip()]
+    os.chdir(HERE)  # .streamlit/secrets.toml 위치
+    warmup.start([k for k in keys if k], font=("MaruBuri", FONT_PATH) if os.path.exists(FONT_PATH) else None)
+
+    from streamlit.web import cli
+
+    sys.argv = ["streamlit", "run", APP_PATH, *sys.argv[1:]]
+    return cli.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
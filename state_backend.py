@@ -0,0 +1,180 @@
+"""여러 서버 프로세스(워커)가 같이 쓰는 상태 저장소.
+
+st.session_state와 st.cache_resource는 프로세스 안에만 있어서, 워커를 여러 개
+띄우면 저장한 배치 · 받아 둔 명단 · 만든 PDF를 서로 모른다. 여기에 두면 같은
+학교의 모든 워커가 같은 값을 본다.
+
+Redis처럼 bytes 키/값만 다루는 작은 인터페이스다:
+
+    get(key) → bytes | None
+    set(key, value, ttl=None)      # ttl 초가 지나면 사라짐
+    delete(key)
+    scan(prefix) → [key, ...]
+
+MYCLASS_STATE_URL로 고른다 (기본: 임시 폴더의 SQLite 파일, 앱 폴더마다 따로). 열지 못하면 로그를 남기고
+프로세스 안의 메모리 저장소로 대신한다 (워커끼리는 공유되지 않음).
+
+    sqlite:///절대/경로/state.sqlite3
+    redis://localhost:6379/0       # redis 패키지 필요
+    memory://                      # 프로세스 하나일 때 (테스트용)
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+# 기본 파일 이름에 앱 폴더를 넣어, 같은 컴퓨터의 다른 설치본(개발용 사본 등)과 섞이지 않게 한다
+DEFAULT_URL = "sqlite:///" + os.path.join(
+    tempfile.gettempdir(),
+    "myclass_state-%s.sqlite3" % hashlib.sha1(os.path.dirname(os.path.abspath(__file__)).encode()).hexdigest()[:8],
+)
+SQLITE_PURGE_EVERY = 200  # set 몇 번마다 만료된 항목을 지울지
+
+log = logging.getLogger("myclass.state")
+
+_lock = threading.Lock()
+_backends = {}
+
+
+class MemoryBackend:
+    """한 프로세스 안에서만 공유 (테스트 · 워커 1개용)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = {}  # key → (value, 만료 시각 또는 None)
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires < time.time():
+                del self._items[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._items[key] = (bytes(value), time.time() + ttl if ttl else None)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def scan(self, prefix=""):
+        now = time.time()
+        with self._lock:
+            return sorted(
+                key for key, (_, expires) in self._items.items()
+                if key.startswith(prefix) and (expires is None or expires >= now)
+            )
+
+
+class SQLiteBackend:
+    """SQLite 파일 하나. 같은 컴퓨터의 워커들이 같이 쓴다 (WAL 모드)."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._sets = 0
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)"
+        )
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM kv WHERE key = ? AND (expires IS NULL OR expires >= ?)",
+                (key, time.time()),
+            ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def set(self, key, value, ttl=None):
+        expires = time.time() + ttl if ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+                (key, sqlite3.Binary(value), expires),
+            )
+            self._sets += 1
+            if self._sets % SQLITE_PURGE_EVERY == 0:
+                self._conn.execute("DELETE FROM kv WHERE expires < ?", (time.time(),))
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def scan(self, prefix=""):
+        # LIKE 대신 범위 비교 (접두어에 %, _ 가 있어도 안전)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM kv WHERE key >= ? AND key < ? AND (expires IS NULL OR expires >= ?) ORDER BY key",
+                (prefix, prefix + "\U0010ffff", time.time()),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+class RedisBackend:
+    """redis-py 같은 클라이언트(get / set(ex=) / delete / scan_iter)를 감싼다."""
+
+    def __init__(self, client, namespace="myclass:"):
+        self.client = client
+        self.namespace = namespace
+
+    def get(self, key):
+        return self.client.get(self.namespace + key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.namespace + key, value, ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        self.client.delete(self.namespace + key)
+
+    def scan(self, prefix=""):
+        skip = len(self.namespace)
+        keys = self.client.scan_iter(match=_redis_glob(self.namespace + prefix) + "*")
+        return sorted((k.decode("utf-8") if isinstance(k, bytes) else k)[skip:] for k in keys)
+
+
+def _redis_glob(text):
+    for ch in "\\*?[]":
+        text = text.replace(ch, "\\" + ch)
+    return text
+
+
+def from_url(url):
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("MYCLASS_STATE_URL이 redis인데 redis 패키지가 없습니다 (pip install redis).")
+        return RedisBackend(redis.Redis.from_url(url))
+    raise ValueError(f"알 수 없는 MYCLASS_STATE_URL: {url}")
+
+
+def get_backend(url=None):
+    # 프로세스에서 URL마다 하나만 연다. 열지 못하면(패키지 없음, 쓸 수 없는 경로 …)
+    # 기록만 남기고 이 프로세스 안의 메모리 저장소로 계속한다
+    url = url or os.environ.get("MYCLASS_STATE_URL") or DEFAULT_URL
+    with _lock:
+        backend = _backends.get(url)
+        if backend is None:
+            try:
+                backend = from_url(url)
+            except Exception as e:
+                log.error("state backend %s unavailable, using process memory only: %s", url, e)
+                backend = MemoryBackend()
+            _backends[url] = backend
+        return backend
@@ -0,0 +1,204 @@
+"""서버 미리 데우기 + 명단 백그라운드 새로고침.
+
+app.py는 접속(rerun)마다 처음부터 다시 실행되지만, import한 모듈은 프로세스에
+한 번만 올라온다. 그래서 폰트 등록, Sheets 인증 클라이언트, 불러온 명단을 여기
+모듈 상태로 두고 모든 세션이 같이 쓴다.
+
+- app.py가 처음 실행될 때 start()가 백그라운드 스레드를 띄운다.
+- serve.py로 서버를 켜면 첫 접속 전에 미리 시작된다.
+- 스레드는 REFRESH_SECONDS마다 명단을 다시 받아 둔다. 받은 명단은 상태 저장소
+  (state_backend.py)에도 남겨서, 다른 워커가 먼저 받아 둔 게 충분히 새것이면
+  네트워크 대신 그것을 쓴다 (워커가 여럿이어도 간격마다 한 번 정도만 받음).
+- 화면(rerun)은 받아 둔 명단만 읽으므로 네트워크를 기다리지 않는다.
+  (아직 한 번도 못 받았을 때만 첫 결과를 기다린다.)
+
+    MYCLASS_ROSTER_REFRESH=300            # 새로고침 간격(초), 0이면 끔
+    MYCLASS_PREFETCH_SHEETS=<id>,<id>     # serve.py가 미리 받을 추가 스프레드시트
+"""
+import importlib
+import json
+import logging
+import os
+import threading
+import time
+
+import state_backend
+
+READ_SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
+REFRESH_SECONDS = float(os.environ.get("MYCLASS_ROSTER_REFRESH", "300"))
+FIRST_FETCH_TIMEOUT = 30  # 첫 명단을 기다리는 최대 시간(초)
+WARM_IMPORTS = [
+    "pandas",
+    "gspread",
+    "openpyxl",
+    "reportlab.pdfgen.canvas",
+    "reportlab.pdfbase.ttfonts",
+    "matplotlib.figure",
+]
+
+log = logging.getLogger("myclass.warmup")
+
+_lock = threading.Lock()
+_wake = threading.Event()
+_state = {
+    "thread": None,
+    "force": False,  # 다음 새로고침은 저장소 사본을 쓰지 말고 직접 받기
+    "client": None,
+    "fonts": {},    # (이름, 경로) → 등록된 글꼴 이름 (실패하면 "Helvetica")
+    "rosters": {},  # 스프레드시트 ID → {"records", "fetched_at", "error", "ready"}
+}
+
+
+def warm_imports():
+    for name in WARM_IMPORTS:
+        importlib.import_module(name)
+
+
+def register_font(name, path):
+    # pdfmetrics 등록은 프로세스 전체에 남으니 글꼴 파일당 한 번만 읽는다
+    if not path:
+        return "Helvetica"
+    key = (name, os.path.realpath(path))
+    with _lock:
+        if key in _state["fonts"]:
+            return _state["fonts"][key]
+
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    try:
+        pdfmetrics.registerFont(TTFont(name, path))
+        registered = name
+    except Exception:
+        registered = "Helvetica"
+    with _lock:
+        _state["fonts"][key] = registered
+    return registered
+
+
+def sheets_client():
+    # 읽기 전용 클라이언트는 한 번만 인증한다
+    with _lock:
+        client = _state["client"]
+    if client is not None:
+        return client
+
+    import gspread
+    import streamlit as st
+    from google.oauth2.service_account import Credentials
+
+    creds = Credentials.from_service_account_info(st.secrets["gcp_service_account"], scopes=READ_SCOPES)
+    client = gspread.authorize(creds)
+    with _lock:
+        _state["client"] = client
+    return client
+
+
+def _entry(key):
+    with _lock:
+        return _state["rosters"].setdefault(
+            key, {"records": None, "fetched_at": None, "error": None, "ready": threading.Event()}
+        )
+
+
+def _shared_copy(key):
+    # 다른 워커가 저장소에 남긴 명단 {"records", "fetched_at"} (없거나 읽기 실패면 None)
+    try:
+        raw = state_backend.get_backend().get(f"roster:{key}")
+        return json.loads(raw) if raw else None
+    except Exception as e:
+        log.warning("shared roster read failed for %s: %s", key, e)
+        return None
+
+
+def _share(key, records, fetched_at):
+    try:
+        raw = json.dumps({"records": records, "fetched_at": fetched_at}, ensure_ascii=False, default=str)
+        state_backend.get_backend().set(f"roster:{key}", raw.encode("utf-8"))
+    except Exception as e:
+        log.warning("shared roster write failed for %s: %s", key, e)
+
+
+def refresh(key, max_age=0):
+    # 명단을 받아 저장한다. 실패해도 예전 명단은 그대로 둔다.
+    # max_age초보다 새로운 사본이 저장소에 있으면 그것을 쓴다
+    entry = _entry(key)
+    shared = _shared_copy(key) if max_age else None
+    if shared and time.time() - shared["fetched_at"] < max_age:
+        with _lock:
+            if entry["fetched_at"] is None or shared["fetched_at"] > entry["fetched_at"]:
+                entry["records"] = shared["records"]
+                entry["fetched_at"] = shared["fetched_at"]
+            entry["error"] = None
+        entry["ready"].set()
+        return
+
+    started = time.perf_counter()
+    try:
+        records = sheets_client().open_by_key(key).sheet1.get_all_records()
+    except Exception as e:
+        with _lock:
+            entry["error"] = str(e) or type(e).__name__
+        log.warning("roster refresh failed for %s: %s", key, e)
+    else:
+        fetched_at = time.time()
+        with _lock:
+            entry["records"] = records
+            entry["fetched_at"] = fetched_at
+            entry["error"] = None
+        _share(key, records, fetched_at)
+        log.info("roster %s refreshed: %d rows in %.0f ms", key, len(records), (time.perf_counter() - started) * 1000)
+    entry["ready"].set()
+
+
+def _run():
+    warm_imports()
+    while True:
+        _wake.clear()
+        with _lock:
+            keys = list(_state["rosters"])
+            force, _state["force"] = _state["force"], False
+        for key in keys:
+            refresh(key, max_age=0 if force else REFRESH_SECONDS)
+        _wake.wait(REFRESH_SECONDS if REFRESH_SECONDS > 0 else None)
+
+
+def start(keys=(), font=None):
+    # 여러 번 불러도 스레드는 하나. 새 ID가 오면 바로 한 번 받아 온다
+    new_keys = [key for key in keys if key not in _state["rosters"]]
+    for key in new_keys:
+        _entry(key)
+    if font:
+        register_font(*font)
+
+    with _lock:
+        thread = _state["thread"]
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(target=_run, name="myclass-warmup", daemon=True)
+            _state["thread"] = thread
+            thread.start()
+        elif new_keys:
+            _wake.set()
+
+
+def roster(key, timeout=FIRST_FETCH_TIMEOUT):
+    # 받아 둔 명단 (records, fetched_at, error). 처음 한 번만 기다린다
+    start([key])
+    entry = _entry(key)
+    entry["ready"].wait(timeout)
+    with _lock:
+        return entry["records"], entry["fetched_at"], entry["error"]
+
+
+def request_refresh():
+    # 백그라운드 스레드를 깨워 바로 다시 받게 한다 (기다리지 않음)
+    with _lock:
+        _state["force"] = True
+    _wake.set()
+
+
+def reset():
+    # 인증 클라이언트와 받아 둔 명단을 버린다 (벤치마크에서 가짜 시트를 바꿀 때)
+    with _lock:
+        _state["client"] = None
+        _state["rosters"].clear()